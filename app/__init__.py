@@ -2,17 +2,27 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from app.config import Config
+from app.ratelimit import RateLimiter
+from app.cache import FragmentCache
+from app.routing import RoutingSession, DEFAULT_SHARD
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login' # Specifies the route for login
+limiter = RateLimiter()
+fragment_cache = FragmentCache()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    if DEFAULT_SHARD in app.config['SHARD_BINDS']:
+        raise ValueError(f"'{DEFAULT_SHARD}' is reserved for the default database")
+    app.config['SQLALCHEMY_BINDS'] = {**app.config.get('SQLALCHEMY_BINDS', {}), **app.config['SHARD_BINDS']}
 
     db.init_app(app)
     login_manager.init_app(app)
+    limiter.init_app(app)
+    fragment_cache.init_app(app)
 
     # Register blueprints here (e.g., for auth, main)
     from app.auth import bp as auth_bp
@@ -21,4 +31,13 @@ def create_app(config_class=Config):
     from app.main import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from app.api import bp as api_bp
+    app.register_blueprint(api_bp, url_prefix='/api')
+
+    from app import sharding
+    app.before_request(sharding.select_shard)
+
+    from app import cli
+    cli.register(app)
+
     return app
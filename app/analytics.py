@@ -0,0 +1,116 @@
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Transcription, MoM, UserDailyStats
+from app.segments import SegmentIndex
+from app.archive import read_text
+
+
+def record_transcription(transcription, index=None):
+    """
+    Adds a newly saved transcription to its owner's daily aggregates.
+    Runs inside the caller's transaction, so the counters commit (or roll
+    back) together with the transcription itself.
+    """
+    # Pin the timestamp here rather than leaving it to the database's
+    # current_timestamp, whose timezone depends on the backend's session
+    # settings; record_mom and rebuild() take the day from this column too.
+    if transcription.timestamp is None:
+        transcription.timestamp = datetime.now(timezone.utc).replace(tzinfo=None)
+    day = transcription.timestamp.date()
+    _bump(transcription.user_id, day,
+          meetings=1,
+          words=len(transcription.body.split()),
+          seconds=index.duration if index else 0.0)
+
+
+def record_mom(transcription):
+    """Counts a newly created MoM against the day its transcription was saved."""
+    _bump(transcription.user_id, transcription.timestamp.date(), moms=1)
+
+
+def _bump(user_id, day, **deltas):
+    # Increment in SQL so concurrent writers never lose an update; the first
+    # write of the day inserts the row instead.
+    query = UserDailyStats.query.filter_by(user_id=user_id, day=day)
+    values = {getattr(UserDailyStats, k): getattr(UserDailyStats, k) + v for k, v in deltas.items()}
+    if query.update(values, synchronize_session=False):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(UserDailyStats(user_id=user_id, day=day, **_zero_counts(deltas)))
+    except IntegrityError:
+        # Another worker inserted the row first
+        query.update(values, synchronize_session=False)
+
+
+def _zero_counts(deltas):
+    counts = {'meetings': 0, 'words': 0, 'seconds': 0.0, 'moms': 0}
+    counts.update(deltas)
+    return counts
+
+
+def rebuild(batch_size=1000):
+    """
+    Recomputes every aggregate from the Transcription and MoM tables,
+    reading transcriptions in primary-key ordered batches. Returns the
+    number of transcriptions scanned.
+    """
+    totals = {}
+    scanned = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(Transcription.id, Transcription.user_id, Transcription.timestamp,
+                                Transcription.body, Transcription.segment_index, MoM.id,
+                                Transcription.archive_segment, Transcription.archive_offset,
+                                Transcription.archive_length)\
+                         .outerjoin(MoM, MoM.transcription_id == Transcription.id)\
+                         .filter(Transcription.id > last_id)\
+                         .order_by(Transcription.id)\
+                         .limit(batch_size).all()
+        if not rows:
+            break
+        for trans_id, user_id, timestamp, body, segment_index, mom_id, *archived_at in rows:
+            if archived_at[0] is not None:
+                body = read_text(*archived_at)
+            counts = totals.setdefault((user_id, timestamp.date()), _zero_counts({}))
+            counts['meetings'] += 1
+            counts['words'] += len(body.split())
+            if segment_index is not None:
+                counts['seconds'] += SegmentIndex.from_bytes(segment_index).duration
+            if mom_id is not None:
+                counts['moms'] += 1
+        scanned += len(rows)
+        last_id = rows[-1][0]
+
+    UserDailyStats.query.delete()
+    items = list(totals.items())
+    for start in range(0, len(items), batch_size):
+        db.session.add_all(UserDailyStats(user_id=user_id, day=day, **counts)
+                           for (user_id, day), counts in items[start:start + batch_size])
+        db.session.flush()
+    db.session.commit()
+    return scanned
+
+
+def summary_for(user_id, days=30):
+    """Totals and the most recent per-day rows for a user, from the aggregates only."""
+    totals = db.session.query(db.func.coalesce(db.func.sum(UserDailyStats.meetings), 0),
+                              db.func.coalesce(db.func.sum(UserDailyStats.words), 0),
+                              db.func.coalesce(db.func.sum(UserDailyStats.seconds), 0.0),
+                              db.func.coalesce(db.func.sum(UserDailyStats.moms), 0))\
+                       .filter(UserDailyStats.user_id == user_id).one()
+    meetings, words, seconds, moms = totals
+    recent = UserDailyStats.query.filter_by(user_id=user_id)\
+                                 .order_by(UserDailyStats.day.desc())\
+                                 .limit(days).all()
+    return {
+        'meetings': meetings,
+        'words': words,
+        'minutes': seconds / 60.0,
+        'moms': moms,
+        'coverage': moms / meetings if meetings else 0.0,
+        'days': recent,
+    }
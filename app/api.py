@@ -0,0 +1,130 @@
+import json
+
+from flask import Blueprint, Response, current_app, request
+from flask_login import current_user
+
+from app import db
+from app.archive import read_text
+from app.models import Transcription, MoM
+
+bp = Blueprint('api', __name__)
+
+PREVIEW_CHARS = 150
+MAX_ID = 2 ** 63 - 1 # Largest id any supported database can store
+
+# Field name -> column expression. Only the requested ones are selected.
+TRANSCRIPTION_FIELDS = {
+    'id': Transcription.id,
+    'timestamp': Transcription.timestamp,
+    'preview': db.func.substr(Transcription.body, 1, PREVIEW_CHARS),
+    'body': Transcription.body,
+    'duplicate_of_id': Transcription.duplicate_of_id,
+}
+MOM_FIELDS = {
+    'id': MoM.id,
+    'transcription_id': MoM.transcription_id,
+    'summary': MoM.summary,
+    'created_at': MoM.created_at,
+    'updated_at': MoM.updated_at,
+}
+DEFAULT_TRANSCRIPTION_FIELDS = 'id,timestamp,preview'
+DEFAULT_MOM_FIELDS = 'id,transcription_id,summary,updated_at'
+
+
+class _BadRequest(Exception):
+    pass
+
+
+def _parse_ids():
+    raw = request.args.get('ids', '')
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+    except ValueError:
+        raise _BadRequest('ids must be a comma separated list of integers')
+    if any(not 0 < i <= MAX_ID for i in ids):
+        raise _BadRequest(f'ids must be between 1 and {MAX_ID}')
+    if not ids:
+        raise _BadRequest('No ids provided')
+    if len(ids) > current_app.config['API_MAX_IDS']:
+        raise _BadRequest(f"At most {current_app.config['API_MAX_IDS']} ids per request")
+    return ids
+
+
+def _parse_fields(allowed, default):
+    fields = list(dict.fromkeys(f.strip() for f in request.args.get('fields', default).split(',') if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown or not fields:
+        raise _BadRequest(f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}" if unknown
+                          else 'No fields requested')
+    return fields
+
+
+def _json(payload, status=200):
+    # Plain json.dumps on pre-built dicts; skips jsonify's key sorting and type dispatch
+    return Response(json.dumps(payload, separators=(',', ':')), status=status, mimetype='application/json')
+
+
+def _batch_response(ids, rows, fields, convert):
+    # One row per id the user owns; anything else is reported as not found,
+    # without revealing whether it exists for someone else.
+    by_id = {}
+    for row in rows:
+        by_id[row.id] = {field: convert(field, row) for field in fields}
+    data = [by_id[i] for i in ids if i in by_id]
+    errors = [{'id': i, 'error': 'not_found'} for i in ids if i not in by_id]
+    return _json({'status': 'success', 'data': data, 'errors': errors})
+
+
+@bp.before_request
+def _require_login():
+    # JSON 401 instead of login_required's redirect to the HTML login page
+    if not current_user.is_authenticated and not current_app.config.get('LOGIN_DISABLED'):
+        return _json({'status': 'error', 'message': 'Authentication required'}, 401)
+    return None
+
+
+def _plain(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+@bp.route('/transcriptions')
+def transcriptions():
+    try:
+        ids = _parse_ids()
+        fields = _parse_fields(TRANSCRIPTION_FIELDS, DEFAULT_TRANSCRIPTION_FIELDS)
+    except _BadRequest as e:
+        return _json({'status': 'error', 'message': str(e)}, 400)
+
+    columns = [TRANSCRIPTION_FIELDS[f].label(f) for f in fields]
+    needs_text = 'body' in fields or 'preview' in fields
+    if needs_text:
+        # Archived rows keep an empty body; their text comes from the archive tier
+        columns += [Transcription.archive_segment, Transcription.archive_offset, Transcription.archive_length]
+    if 'id' not in fields:
+        columns.append(Transcription.id.label('id'))
+    # Ownership is part of the same single query
+    rows = db.session.query(*columns)\
+                     .filter(Transcription.id.in_(ids), Transcription.user_id == current_user.id).all()
+
+    def convert(field, row):
+        if field in ('body', 'preview') and row.archive_segment is not None:
+            text = read_text(row.archive_segment, row.archive_offset, row.archive_length)
+            return text if field == 'body' else text[:PREVIEW_CHARS]
+        return _plain(getattr(row, field))
+
+    return _batch_response(ids, rows, fields, convert)
+
+
+@bp.route('/moms')
+def moms():
+    try:
+        ids = _parse_ids()
+        fields = _parse_fields(MOM_FIELDS, DEFAULT_MOM_FIELDS)
+    except _BadRequest as e:
+        return _json({'status': 'error', 'message': str(e)}, 400)
+
+    columns = [MOM_FIELDS[f].label(f) for f in fields]
+    if 'id' not in fields:
+        columns.append(MoM.id.label('id'))
+    rows = db.session.query(*columns).filter(MoM.id.in_(ids), MoM.user_id == current_user.id).all()
+    return _batch_response(ids, rows, fields, lambda field, row: _plain(getattr(row, field)))
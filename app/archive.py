@@ -0,0 +1,179 @@
+import fcntl
+import glob
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+
+from app import db
+
+# Each record: magic, transcription id, compressed length, crc32 of the
+# compressed bytes, then the zlib-compressed UTF-8 text. Records are only
+# ever appended; the stub row keeps (segment, offset, length) as the index.
+_RECORD = struct.Struct('<4sQII')
+_MAGIC = b'TRA1'
+
+
+class ArchiveStore:
+    """
+    Append-only, compressed segment files for cold transcript bodies.
+    Reads go through a per-process memory map of each segment, so fetching
+    one archived transcript touches only the pages that hold its record.
+    """
+
+    def __init__(self, directory, segment_bytes):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._maps = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f'segment-{segment:06d}.dat')
+
+    def _current_segment(self):
+        segments = sorted(glob.glob(os.path.join(self.directory, 'segment-*.dat')))
+        if not segments:
+            return 1
+        last = int(os.path.basename(segments[-1])[8:14])
+        if os.path.getsize(segments[-1]) >= self.segment_bytes:
+            return last + 1
+        return last
+
+    def writer(self):
+        return _ArchiveWriter(self)
+
+    def read(self, segment, offset, length):
+        mapped = self._map(segment, offset + _RECORD.size + length)
+        magic, _, stored_length, crc = _RECORD.unpack_from(mapped, offset)
+        payload = mapped[offset + _RECORD.size:offset + _RECORD.size + length]
+        if magic != _MAGIC or stored_length != length or zlib.crc32(payload) != crc:
+            raise ValueError(f'Corrupt archive record at segment {segment} offset {offset}')
+        return zlib.decompress(payload).decode('utf-8')
+
+    def _map(self, segment, needed):
+        with self._lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or len(mapped) < needed:
+                # The newest segment grows as records are appended; remap it
+                if mapped is not None:
+                    mapped.close()
+                with open(self._path(segment), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            return mapped
+
+
+class _ArchiveWriter:
+    """Appends records under an exclusive lock; close() fsyncs them."""
+
+    def __init__(self, store):
+        self.store = store
+        self._file = None
+        self._segment = None
+
+    def append(self, transcription_id, text):
+        if self._file is None or self._file.tell() >= self.store.segment_bytes:
+            self._open_next()
+        payload = zlib.compress(text.encode('utf-8'))
+        offset = self._file.tell()
+        self._file.write(_RECORD.pack(_MAGIC, transcription_id, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        return self._segment, offset, len(payload)
+
+    def _open_next(self):
+        self.close()
+        self._segment = self.store._current_segment()
+        self._file = open(self.store._path(self._segment), 'ab')
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def get_store():
+    store = current_app.extensions.get('archive')
+    if store is None:
+        store = ArchiveStore(current_app.config['ARCHIVE_DIR'], current_app.config['ARCHIVE_SEGMENT_BYTES'])
+        current_app.extensions['archive'] = store
+    return store
+
+
+def read_text(segment, offset, length):
+    return get_store().read(segment, offset, length)
+
+
+def archive_older_than(days, batch_size=500):
+    """
+    Moves the bodies of transcriptions older than `days` into the archive,
+    leaving stub rows. Each batch is fsynced before its stubs are committed,
+    so a crash can leave an unreferenced record but never lose a body.
+    Returns the number of transcriptions archived.
+    """
+    from app.models import Transcription
+
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+    archived = 0
+    last_id = 0
+    store = get_store()
+    while True:
+        batch = Transcription.query.filter(Transcription.id > last_id,
+                                           Transcription.timestamp < cutoff,
+                                           Transcription.archive_segment.is_(None))\
+                                   .order_by(Transcription.id)\
+                                   .limit(batch_size).all()
+        if not batch:
+            break
+        with store.writer() as writer:
+            for transcription in batch:
+                location = writer.append(transcription.id, transcription.body)
+                transcription.archive_segment, transcription.archive_offset, transcription.archive_length = location
+        for transcription in batch:
+            transcription.body = ''
+        db.session.commit()
+        archived += len(batch)
+        last_id = batch[-1].id
+    return archived
+
+
+def restore_newer_than(days=None, batch_size=500):
+    """
+    Copies archived bodies back into their rows, for transcriptions saved
+    within the last `days` (or all of them). The archive files are left as
+    they are. Returns the number of transcriptions restored.
+    """
+    from app.models import Transcription
+
+    query = Transcription.query.filter(Transcription.archive_segment.isnot(None))
+    if days is not None:
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+        query = query.filter(Transcription.timestamp >= cutoff)
+    restored = 0
+    last_id = 0
+    while True:
+        batch = query.filter(Transcription.id > last_id).order_by(Transcription.id).limit(batch_size).all()
+        if not batch:
+            break
+        for transcription in batch:
+            transcription.body = transcription.text
+            transcription.archive_segment = transcription.archive_offset = transcription.archive_length = None
+        db.session.commit()
+        restored += len(batch)
+        last_id = batch[-1].id
+    return restored
@@ -0,0 +1,157 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class _FragmentStore:
+    """
+    Size-bounded LRU of rendered fragments, optionally backed by a directory
+    shared by all workers on the host. Every entry carries a version string;
+    a lookup with a different version is a miss, so stale entries are never
+    served even if an invalidation only reached one worker.
+
+    The directory is bounded too: file mtimes track recency (refreshed on
+    every disk hit) and, every so many writes, the least recently used files
+    beyond max_entries are removed. It can briefly overshoot by up to that
+    many writes per worker.
+    """
+
+    def __init__(self, max_entries, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Pruning lists the directory, so it runs once per tenth of the capacity written
+        self._prune_every = max(1, max_entries // 10)
+        self._writes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        value = self._read_disk(key, version)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._store(key, version, value)
+        return value
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._store(key, version, value)
+        if self.directory:
+            # Write then rename so other workers never read a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(version + '\n' + value)
+            os.replace(tmp, self._path(key))
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % self._prune_every == 0
+            if prune:
+                self._prune_disk()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.directory:
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries), 'max_entries': self.max_entries,
+                'shared': bool(self.directory)}
+
+    def _store(self, key, version, value):
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.html')
+
+    def _read_disk(self, key, version):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                stored_version, _, value = f.read().partition('\n')
+        except FileNotFoundError:
+            return None
+        if stored_version != version:
+            return None
+        try:
+            os.utime(self._path(key)) # Mark as recently used for _prune_disk
+        except FileNotFoundError:
+            pass
+        return value
+
+    def _prune_disk(self):
+        files = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.html'):
+                    try:
+                        files.append((entry.stat().st_mtime, entry.path))
+                    except FileNotFoundError:
+                        pass # Removed by another worker meanwhile
+        if len(files) <= self.max_entries:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.max_entries]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def dashboard_row_key(shard, user_id, transcription_id):
+    # Ids are only unique within a shard; the owner is part of the key as well,
+    # so a row can never be served to anyone but the user who owns it
+    return f'transcription-{shard}-{user_id}-{transcription_id}'
+
+
+class FragmentCache:
+    """Flask extension wrapper; each app gets its own store."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FRAGMENT_CACHE_SIZE', 1000)
+        app.config.setdefault('FRAGMENT_CACHE_DIR', None)
+        app.extensions['fragment_cache'] = _FragmentStore(app.config['FRAGMENT_CACHE_SIZE'],
+                                                          app.config['FRAGMENT_CACHE_DIR'])
+
+    @property
+    def store(self):
+        return current_app.extensions['fragment_cache']
+
+    def get(self, key, version):
+        return self.store.get(key, version)
+
+    def set(self, key, version, value):
+        self.store.set(key, version, value)
+
+    def invalidate(self, key):
+        self.store.invalidate(key)
+
+    def stats(self):
+        return self.store.stats()
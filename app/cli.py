@@ -0,0 +1,80 @@
+import click
+from flask import current_app
+
+
+def register(app):
+    """Registers the maintenance commands on the app's `flask` CLI."""
+
+    @app.cli.command('rebuild-stats')
+    @click.option('--batch-size', default=1000, show_default=True, help='Transcriptions read per query.')
+    def rebuild_stats(batch_size):
+        """Recompute the per-user analytics aggregates from scratch."""
+        from app import analytics, sharding
+        scanned = sum(analytics.rebuild(batch_size=batch_size) for _ in sharding.each_shard())
+        click.echo(f'Rebuilt analytics from {scanned} transcriptions.')
+
+    @app.cli.command('dedup-scan')
+    @click.option('--batch-size', default=500, show_default=True, help='Transcriptions indexed per commit.')
+    def dedup_scan(batch_size):
+        """Index existing transcriptions for near-duplicate detection."""
+        from app import dedup, sharding
+        scanned = flagged = 0
+        for _ in sharding.each_shard(): # Duplicates are only looked for within a shard
+            shard_scanned, shard_flagged = dedup.scan(current_app.config['DEDUP_THRESHOLD'], batch_size=batch_size)
+            scanned += shard_scanned
+            flagged += shard_flagged
+        click.echo(f'Indexed {scanned} transcriptions, flagged {flagged} as near-duplicates.')
+
+    @app.cli.command('archive-transcripts')
+    @click.option('--days', default=30, show_default=True, help='Archive transcriptions older than this many days.')
+    @click.option('--batch-size', default=500, show_default=True)
+    def archive_transcripts(days, batch_size):
+        """Move old transcript bodies into the compressed archive tier."""
+        from app import archive, sharding
+        count = sum(archive.archive_older_than(days, batch_size=batch_size) for _ in sharding.each_shard())
+        click.echo(f'Archived {count} transcriptions.')
+
+    @app.cli.command('restore-transcripts')
+    @click.option('--days', type=int, default=None, help='Only restore transcriptions saved within this many days (default: all).')
+    @click.option('--batch-size', default=500, show_default=True)
+    def restore_transcripts(days, batch_size):
+        """Move archived transcript bodies back into the database."""
+        from app import archive, sharding
+        count = sum(archive.restore_newer_than(days, batch_size=batch_size) for _ in sharding.each_shard())
+        click.echo(f'Restored {count} transcriptions.')
+
+    @app.cli.command('prune-summary-drafts')
+    @click.option('--hours', default=24, show_default=True, help='Delete drafts not updated for this many hours.')
+    def prune_summary_drafts(hours):
+        """Delete running summaries of recordings that were never saved."""
+        from datetime import datetime, timedelta
+        from app import db, sharding
+        from app.models import SummaryDraft
+        cutoff = datetime.utcnow() - timedelta(hours=hours)
+        count = 0
+        for _ in sharding.each_shard():
+            count += SummaryDraft.query.filter(SummaryDraft.updated_at < cutoff).delete(synchronize_session=False)
+            db.session.commit()
+        click.echo(f'Deleted {count} summary drafts.')
+
+    @app.cli.command('move-user')
+    @click.argument('user_id', type=int)
+    @click.argument('shard')
+    @click.option('--batch-size', default=500, show_default=True, help='Transcriptions copied per query.')
+    def move_user(user_id, shard, batch_size):
+        """Move a user's transcriptions, MoMs and stats to another shard."""
+        from app import sharding
+        try:
+            moved = sharding.move_user(user_id, shard, batch_size=batch_size)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='SHARD')
+        click.echo(f'Moved {moved} transcriptions of user {user_id} to {shard}.')
+
+    @app.cli.command('upgrade-schema')
+    def upgrade_schema():
+        """Add the columns and unique keys that existing tables are missing."""
+        from app.schema import upgrade_schema
+        left = upgrade_schema()
+        if left:
+            raise click.ClickException('Cannot add automatically, migrate by hand: ' + ', '.join(left))
+        click.echo('Database schema is up to date.')
@@ -1,12 +1,46 @@
 import os
 
+def _parse_shard_urls(value):
+    # "shard1=sqlite:///shard1.db,shard2=postgresql://..." -> {'shard1': ..., 'shard2': ...}
+    if not value:
+        return {}
+    return dict(part.strip().split('=', 1) for part in value.split(',') if part.strip())
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Optional horizontal sharding of transcription data by user (see app/sharding.py).
+    # The default database keeps users and the shard map and also serves as shard 'default'.
+    SHARD_BINDS = _parse_shard_urls(os.environ.get('SHARD_DATABASE_URLS'))
+    # How long move-user waits for writes that started just before the move to finish (the request timeout)
+    SHARD_MOVE_DRAIN_SECONDS = float(os.environ.get('SHARD_MOVE_DRAIN_SECONDS') or 30)
     WTF_CSRF_ENABLED = True # Default, can be overridden in TestConfig
 
+    # Admission control for write endpoints (see app/ratelimit.py)
+    RATELIMIT_ENABLED = True
+    RATELIMIT_PER_MINUTE = int(os.environ.get('RATELIMIT_PER_MINUTE') or 30) # Sustained writes per user and endpoint
+    RATELIMIT_BURST = int(os.environ.get('RATELIMIT_BURST') or 10)
+    RATELIMIT_STORAGE_PATH = os.environ.get('RATELIMIT_STORAGE_PATH') # Shared mmap file so limits hold across workers
+    MAX_CONCURRENT_WRITES = int(os.environ.get('MAX_CONCURRENT_WRITES') or 8) # Across all workers when RATELIMIT_STORAGE_PATH is set
+    SYNC_MAX_ITEMS = 100 # Transcriptions accepted per offline sync request
+    SUMMARY_DRAFT_MAX_SEGMENTS = 200 # Segments accepted per /summary_draft request
+    API_MAX_IDS = 200 # Records per batch read API request
+
+    # Near-duplicate transcript detection (see app/dedup.py)
+    DEDUP_ENABLED = True
+    DEDUP_THRESHOLD = 90 # Minimum RapidFuzz ratio (0-100) to confirm an LSH candidate
+
+    # Rendered dashboard rows (see app/cache.py)
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE') or 1000) # Entries per worker
+    FRAGMENT_CACHE_DIR = os.environ.get('FRAGMENT_CACHE_DIR') # Optional directory shared by all workers
+
+    # Cold storage for old transcript bodies (see app/archive.py)
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'transcript_archive')
+    ARCHIVE_SEGMENT_BYTES = 64 * 1024 * 1024 # Start a new segment file after this size
+
 
 class TestConfig(Config):
     TESTING = True
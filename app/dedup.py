@@ -0,0 +1,112 @@
+import hashlib
+import random
+import re
+from array import array
+
+from rapidfuzz import fuzz, utils
+
+from app import db
+from app.models import Transcription, LshBucket
+
+# 64 MinHash permutations split into 16 LSH bands of 4 rows: two transcripts
+# whose shingle sets have Jaccard similarity s share at least one bucket with
+# probability 1 - (1 - s^4)^16 (about 0.5 at s=0.5, > 0.99 at s=0.8).
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+MAX_CANDIDATES = 20
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601) # Fixed seed: signatures must be comparable across processes and runs
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_WORD_RE = re.compile(r'\w+')
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def minhash(text):
+    """Returns the MinHash signature (array of NUM_PERM ints) of text's word shingles."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) >= SHINGLE_WORDS:
+        shingles = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    else:
+        shingles = {' '.join(words)}
+    hashes = [_hash64(s.encode()) for s in shingles]
+    return array('Q', (min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS))
+
+
+def band_buckets(signature):
+    """One bucket key per band, as signed 64-bit ints so they fit a BIGINT column."""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        key = _hash64(band.to_bytes(2, 'little') + rows.tobytes())
+        buckets.append(key - (1 << 64) if key >= (1 << 63) else key)
+    return buckets
+
+
+def index_transcription(transcription, threshold):
+    """
+    Computes the transcription's signature, looks up candidates sharing an
+    LSH bucket, confirms them with RapidFuzz and flags the transcription as a
+    duplicate of the matching cluster. Finally adds its own buckets to the
+    index. The transcription must already have an id (flushed).
+    """
+    signature = minhash(transcription.text)
+    buckets = band_buckets(signature)
+    transcription.minhash = signature.tobytes()
+
+    duplicate_of = _find_duplicate(transcription, buckets, threshold)
+    if duplicate_of is not None:
+        transcription.duplicate_of_id = duplicate_of.duplicate_of_id or duplicate_of.id
+    db.session.add_all(LshBucket(bucket=b, transcription_id=transcription.id) for b in buckets)
+    return transcription.duplicate_of_id
+
+
+def _find_duplicate(transcription, buckets, threshold):
+    shared = db.func.count(LshBucket.id)
+    candidate_ids = [row[0] for row in
+                     db.session.query(LshBucket.transcription_id)
+                               .filter(LshBucket.bucket.in_(buckets),
+                                       LshBucket.transcription_id != transcription.id)
+                               .group_by(LshBucket.transcription_id)
+                               .order_by(shared.desc())
+                               .limit(MAX_CANDIDATES)]
+    if not candidate_ids:
+        return None
+
+    best, best_score = None, threshold
+    text = utils.default_process(transcription.text)
+    for candidate in Transcription.query.filter(Transcription.id.in_(candidate_ids)):
+        score = fuzz.ratio(text, utils.default_process(candidate.text), score_cutoff=best_score)
+        if score and score >= best_score:
+            best, best_score = candidate, score
+    return best
+
+
+def scan(threshold, batch_size=500):
+    """
+    Indexes every transcription that has no signature yet, oldest first, so
+    each cluster is rooted at its earliest member. Commits once per batch.
+    Returns (scanned, flagged).
+    """
+    scanned = flagged = 0
+    last_id = 0
+    while True:
+        batch = Transcription.query.filter(Transcription.id > last_id, Transcription.minhash.is_(None))\
+                                   .order_by(Transcription.id)\
+                                   .limit(batch_size).all()
+        if not batch:
+            break
+        for transcription in batch:
+            if index_transcription(transcription, threshold):
+                flagged += 1
+            # Later rows in the batch must see this one's buckets
+            db.session.flush()
+        db.session.commit()
+        scanned += len(batch)
+        last_id = batch[-1].id
+    return scanned, flagged
@@ -0,0 +1,58 @@
+import io
+import zipfile
+
+from app import db
+from app.models import Transcription, MoM
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only, non-seekable file object for zipfile. Whatever zipfile has
+    written since the last drain() is handed to the HTTP response, so the
+    archive is never held in memory as a whole.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_export_zip(user_id, batch_size=200):
+    """
+    Yields a ZIP archive of all the user's transcriptions and MoMs, one entry
+    at a time. Rows are pulled through a server-side cursor in batches of
+    batch_size, so memory use depends on the largest transcript, not on
+    how many there are.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        rows = db.session.query(Transcription, MoM)\
+                         .outerjoin(MoM, MoM.transcription_id == Transcription.id)\
+                         .filter(Transcription.user_id == user_id)\
+                         .order_by(Transcription.id)\
+                         .yield_per(batch_size)
+        for transcription, mom in rows:
+            stamp = transcription.timestamp
+            name = f'transcription-{transcription.id}-{stamp.strftime("%Y%m%d-%H%M%S")}'
+            _add_entry(archive, f'{name}.txt', stamp, transcription.text)
+            if mom is not None:
+                _add_entry(archive, f'{name}-mom.txt', mom.updated_at or stamp, mom.summary)
+            yield sink.drain()
+    yield sink.drain() # Central directory, written on close
+
+
+def _add_entry(archive, name, timestamp, text):
+    info = zipfile.ZipInfo(name, date_time=timestamp.timetuple()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    archive.writestr(info, text)
@@ -1,9 +1,19 @@
-from flask import Blueprint, render_template, request, jsonify, flash
+import math
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app, abort, Response, stream_with_context
 from flask_login import current_user, login_required
-from app import db
-from app.models import Transcription, MoM # Make sure MoM model is imported
+from markupsafe import Markup
+from sqlalchemy.exc import IntegrityError
+from app import db, limiter, fragment_cache
+from app.models import Transcription, MoM, SummaryDraft # Make sure MoM model is imported
 from app.forms import MoMForm # Import MoMForm
 from app.utils import generate_basic_summary # Import the summarizer
+from app.segments import SegmentIndex
+from app.summarizer import IncrementalSummarizer
+from app import analytics, dedup
+from app.archive import read_text
+from app.export import iter_export_zip
+from app.routing import current_shard, DEFAULT_SHARD
+from app.cache import dashboard_row_key
 
 bp = Blueprint('main', __name__)
 
@@ -16,42 +26,256 @@ def index():
 @bp.route('/transcribe')
 @login_required # Protect this route
 def transcribe():
-    return render_template('transcribe.html', title='Live Transcription')
+    return render_template('transcribe.html', title='Live Transcription',
+                           sync_max_items=current_app.config['SYNC_MAX_ITEMS'])
+
+def _new_transcription(data):
+    """
+    Validates one transcription payload and builds the (unsaved) Transcription
+    with its segment index and summary state. Raises ValueError with a
+    user-facing message if the payload can't be saved.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('transcription'), str):
+        raise ValueError('No transcription data provided')
+
+    text = data['transcription']
+    if not text.strip():
+        raise ValueError('Transcription is empty')
+
+    # Optional key the client generated for this recording, so retries are idempotent
+    client_id = data.get('client_id')
+    if client_id is not None and (not isinstance(client_id, str) or not 0 < len(client_id) <= 64):
+        raise ValueError('Invalid client id')
+
+    # Optional timing info: [{'text': ..., 'start': seconds, 'end': seconds}, ...]
+    segments = data.get('segments')
+    try:
+        index = SegmentIndex.build(text, segments) if segments else None
+    except (TypeError, KeyError, ValueError, AttributeError):
+        raise ValueError('Invalid segment data')
+
+    transcription = Transcription(body=text, user_id=current_user.id, client_id=client_id)
+    if index:
+        transcription.segment_index = index.to_bytes()
+    draft = _summary_draft(current_user.id, client_id) if client_id and index else None
+    if draft is not None and draft.segments_fed == len(segments):
+        # Already fed segment by segment while recording; no pass over the text
+        transcription.summary_state = draft.state
+        db.session.delete(draft)
+    else:
+        # Recorded offline, without timings, or the draft fell behind
+        summarizer = IncrementalSummarizer()
+        for segment_text in ([s.get('text') or '' for s in segments] if index else [text]):
+            summarizer.feed(segment_text)
+        transcription.summary_state = summarizer.to_bytes()
+    return transcription, index
+
+def _summary_draft(user_id, client_id):
+    return SummaryDraft.query.filter_by(user_id=user_id, client_id=client_id).first()
+
+def _add_transcription(transcription, index):
+    # Everything here joins the caller's transaction
+    db.session.add(transcription)
+    analytics.record_transcription(transcription, index)
+    if current_app.config['DEDUP_ENABLED']:
+        db.session.flush() # dedup needs the new id
+        dedup.index_transcription(transcription, current_app.config['DEDUP_THRESHOLD'])
+
+def _existing_client_ids(user_id, client_ids):
+    if not client_ids:
+        return set()
+    rows = db.session.query(Transcription.client_id)\
+                     .filter(Transcription.user_id == user_id, Transcription.client_id.in_(client_ids))
+    return {row.client_id for row in rows}
 
 @bp.route('/save_transcription', methods=['POST'])
 @login_required
+@limiter.limit('save_transcription')
 def save_transcription():
-    data = request.get_json()
-    if not data or 'transcription' not in data:
-        return jsonify({'status': 'error', 'message': 'No transcription data provided'}), 400
+    try:
+        new_transcription, index = _new_transcription(request.get_json())
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
 
-    text = data['transcription']
-    if not text.strip():
-        return jsonify({'status': 'error', 'message': 'Transcription is empty'}), 400
+    if new_transcription.client_id and _existing_client_ids(current_user.id, [new_transcription.client_id]):
+        # Retry of a request that already went through
+        return jsonify({'status': 'success', 'message': 'Transcription saved'})
 
     try:
-        new_transcription = Transcription(body=text, user_id=current_user.id)
-        db.session.add(new_transcription)
+        _add_transcription(new_transcription, index)
         db.session.commit()
         flash('Transcription saved successfully!', 'success')
         return jsonify({'status': 'success', 'message': 'Transcription saved'})
+    except IntegrityError as e:
+        db.session.rollback()
+        if new_transcription.client_id:
+            # A concurrent retry of the same recording committed first
+            return jsonify({'status': 'success', 'message': 'Transcription saved'})
+        current_app.logger.error(f"Error saving transcription: {e}")
+        return jsonify({'status': 'error', 'message': 'Failed to save transcription due to a server error'}), 500
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error saving transcription: {e}")
         return jsonify({'status': 'error', 'message': 'Failed to save transcription due to a server error'}), 500
 
+@bp.route('/summary_draft', methods=['POST'])
+@login_required
+@limiter.limit('summary_draft')
+def summary_draft():
+    """
+    Feeds final segments of a recording in progress into its running
+    summary and returns the current draft. Body: {"client_id", "offset",
+    "segments": [{"text", ...}, ...]} where offset is the position of the
+    first segment in the recording. Segments the server already has are
+    skipped, so a retry is harmless; a gap gets a 409 with the position to
+    resend from ("segments_fed").
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': 'No segments provided'}), 400
+    client_id, offset, segments = data.get('client_id'), data.get('offset'), data.get('segments')
+    if not isinstance(client_id, str) or not 0 < len(client_id) <= 64:
+        return jsonify({'status': 'error', 'message': 'Invalid client id'}), 400
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0 \
+            or not isinstance(segments, list) or len(segments) > current_app.config['SUMMARY_DRAFT_MAX_SEGMENTS'] \
+            or not all(isinstance(s, dict) and isinstance(s.get('text'), str) for s in segments):
+        return jsonify({'status': 'error', 'message': 'Invalid segment data'}), 400
+
+    draft = _summary_draft(current_user.id, client_id)
+    fed = draft.segments_fed if draft else 0
+    if offset > fed:
+        return jsonify({'status': 'error', 'message': 'Missing earlier segments', 'segments_fed': fed}), 409
+    summarizer = IncrementalSummarizer.from_bytes(draft.state) if draft else IncrementalSummarizer()
+    new_segments = segments[fed - offset:]
+    for segment in new_segments:
+        summarizer.feed(segment['text'])
+
+    if new_segments:
+        if draft is None:
+            draft = SummaryDraft(user_id=current_user.id, client_id=client_id)
+            db.session.add(draft)
+        draft.state = summarizer.to_bytes()
+        draft.segments_fed = fed + len(new_segments)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request created this recording's draft first; the client resends
+            db.session.rollback()
+            return jsonify({'status': 'error', 'message': 'Draft was updated concurrently', 'segments_fed': 0}), 409
+    return jsonify({'status': 'success', 'segments_fed': fed + len(new_segments), 'summary': summarizer.summary()})
+
+@bp.route('/sync_transcriptions', methods=['POST'])
+@login_required
+@limiter.limit('sync_transcriptions')
+def sync_transcriptions():
+    """
+    Saves transcripts queued by a client while it was offline, all in one
+    transaction. Body: {"transcriptions": [{"client_id", "transcription",
+    "segments"?}, ...]}. Returns one status per item, in order: "saved",
+    "duplicate" (client_id already stored) or "error" with a message.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('transcriptions') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'status': 'error', 'message': 'No transcriptions provided'}), 400
+    if len(items) > current_app.config['SYNC_MAX_ITEMS']:
+        return jsonify({'status': 'error', 'message': f"At most {current_app.config['SYNC_MAX_ITEMS']} transcriptions per request"}), 400
+
+    for _ in range(2):
+        try:
+            results = _sync_items(items)
+            db.session.commit()
+            return jsonify({'status': 'success', 'results': results})
+        except IntegrityError as e:
+            # A concurrent sync (another tab, or page load racing the 'online'
+            # event) stored some of these client ids first; the second pass
+            # reports them as duplicates.
+            db.session.rollback()
+            error = e
+        except Exception as e:
+            db.session.rollback()
+            error = e
+            break
+    current_app.logger.error(f"Error syncing transcriptions: {error}")
+    return jsonify({'status': 'error', 'message': 'Failed to sync transcriptions due to a server error'}), 500
+
+def _sync_items(items):
+    # Adds every valid, new item to the session and returns the per-item results
+    client_ids = [item.get('client_id') for item in items if isinstance(item, dict)]
+    seen = _existing_client_ids(current_user.id, [c for c in client_ids if isinstance(c, str)])
+    results, added = [], []
+    for item in items:
+        client_id = item.get('client_id') if isinstance(item, dict) else None
+        result = {'client_id': client_id}
+        results.append(result)
+        if isinstance(client_id, str) and client_id in seen:
+            result['status'] = 'duplicate'
+            continue
+        try:
+            transcription, index = _new_transcription(item)
+        except ValueError as e:
+            result.update(status='error', message=str(e))
+            continue
+        _add_transcription(transcription, index)
+        if client_id:
+            seen.add(client_id)
+        result['status'] = 'saved'
+        added.append((result, transcription))
+
+    db.session.flush()
+    for result, transcription in added:
+        result['id'] = transcription.id
+    return results
+
 @bp.route('/dashboard')
 @login_required
 def dashboard():
     page = request.args.get('page', 1, type=int)
     # Query transcriptions for the current user, ordered by timestamp descending
+    # MoM is joined in for the cache version; body is only loaded for rows that miss
     user_transcriptions = Transcription.query.filter_by(user_id=current_user.id)\
+                                          .options(db.joinedload(Transcription.mom), db.defer(Transcription.body))\
                                           .order_by(Transcription.timestamp.desc())\
                                           .paginate(page=page, per_page=5) # Paginate for better display
-    return render_template('dashboard.html', title='Dashboard', transcriptions=user_transcriptions)
+    return render_template('dashboard.html', title='Dashboard', transcriptions=user_transcriptions,
+                           render_row=_render_dashboard_row)
+
+def _row_cache_key(transcription):
+    return dashboard_row_key(current_shard() or DEFAULT_SHARD, transcription.user_id, transcription.id)
+
+def _render_dashboard_row(trans):
+    # A row only changes when its MoM is created/updated or it gets flagged as a duplicate
+    version = f"{trans.mom.updated_at.isoformat() if trans.mom else '-'}/{trans.duplicate_of_id or '-'}"
+    key = _row_cache_key(trans)
+    html = fragment_cache.get(key, version)
+    if html is None:
+        html = render_template('_transcription_row.html', trans=trans)
+        fragment_cache.set(key, version, html)
+    return Markup(html)
+
+@bp.route('/export')
+@login_required
+def export_zip():
+    # Streamed as it is built: the download starts at once and memory stays flat
+    return Response(stream_with_context(iter_export_zip(current_user.id)),
+                    mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=transcripts.zip'})
+
+@bp.route('/cache_stats')
+@login_required
+def cache_stats():
+    return jsonify(fragment_cache.stats())
+
+@bp.route('/analytics')
+@login_required
+def analytics_view():
+    # Reads only the UserDailyStats aggregates, never Transcription or MoM
+    stats = analytics.summary_for(current_user.id)
+    return render_template('analytics.html', title='Analytics', stats=stats)
 
 @bp.route('/transcription/<int:transcription_id>/mom', methods=['GET', 'POST'])
 @login_required
+@limiter.limit('manage_mom')
 def manage_mom(transcription_id):
     transcription = Transcription.query.get_or_404(transcription_id)
     if transcription.user_id != current_user.id:
@@ -65,23 +289,73 @@ def manage_mom(transcription_id):
         if mom: # Existing MoM, update it
             mom.summary = form.summary.data
             db.session.commit()
+            fragment_cache.invalidate(_row_cache_key(transcription))
             flash('Minutes of Meeting updated successfully!', 'success')
         else: # New MoM, create it
             new_mom = MoM(summary=form.summary.data, 
                           transcription_id=transcription.id, 
                           user_id=current_user.id)
             db.session.add(new_mom)
+            analytics.record_mom(transcription)
             db.session.commit()
+            fragment_cache.invalidate(_row_cache_key(transcription))
             flash('Minutes of Meeting created successfully!', 'success')
         return redirect(url_for('main.dashboard')) # Or redirect to view the MoM itself
 
     if mom: # If MoM exists, pre-fill form with its summary
         form.summary.data = mom.summary
     elif request.method == 'GET': # For new MoM, pre-fill with basic summary on GET
-        form.summary.data = generate_basic_summary(transcription.body)
+        if transcription.summary_state is not None: # Maintained while recording, no pass over the text
+            form.summary.data = IncrementalSummarizer.from_bytes(transcription.summary_state).summary()
+        else:
+            form.summary.data = generate_basic_summary(transcription.text)
         
     return render_template('manage_mom.html', 
                            title='Manage Minutes of Meeting', 
                            form=form, 
                            transcription=transcription,
                            mom=mom)
+
+@bp.route('/transcription/<int:transcription_id>/segments')
+@login_required
+def transcription_segments(transcription_id):
+    """
+    Range queries over a transcript's segment index.
+    ?start=<s>&end=<s> returns the text spoken in that time window (seconds);
+    ?char=<n> returns the segment containing character offset n.
+    Only the index and the requested slice of the body are read.
+    """
+    row = db.session.query(Transcription.user_id, Transcription.segment_index)\
+                    .filter(Transcription.id == transcription_id).first()
+    if row is None or row.user_id != current_user.id:
+        abort(404)
+    if row.segment_index is None:
+        return jsonify({'status': 'error', 'message': 'Transcription has no segment index'}), 404
+    index = SegmentIndex.from_bytes(row.segment_index)
+
+    char_pos = request.args.get('char', type=int)
+    if char_pos is not None:
+        i = index.segment_at_char(char_pos)
+        if i is None:
+            return jsonify({'status': 'error', 'message': 'No segment at that offset'}), 404
+        segment = index.segment(i)
+        segment['text'] = _body_slice(transcription_id, segment['char_start'], segment['char_end'])
+        return jsonify({'status': 'success', 'segment': segment})
+
+    start = request.args.get('start', 0.0, type=float)
+    end = request.args.get('end', index.duration, type=float)
+    if not (math.isfinite(start) and math.isfinite(end)):
+        return jsonify({'status': 'error', 'message': 'start and end must be finite numbers'}), 400
+    span = index.char_range_for_time(start, end)
+    text = _body_slice(transcription_id, *span) if span else ''
+    return jsonify({'status': 'success', 'start': start, 'end': end, 'text': text})
+
+def _body_slice(transcription_id, char_start, char_end):
+    # SQL substr is 1-based; only the requested characters leave the database
+    text, segment, offset, length = db.session.query(
+        db.func.substr(Transcription.body, char_start + 1, char_end - char_start),
+        Transcription.archive_segment, Transcription.archive_offset, Transcription.archive_length)\
+        .filter(Transcription.id == transcription_id).one()
+    if segment is not None:
+        return read_text(segment, offset, length)[char_start:char_end]
+    return text
@@ -1,6 +1,7 @@
 from app import db, login_manager
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from app.segments import SegmentIndex
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -21,17 +22,67 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+class UserShard(db.Model):
+    """Which shard holds a user's transcription data (see app/sharding.py). Lives in the default database."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    shard = db.Column(db.String(64), nullable=False)
+    moving = db.Column(db.Boolean, nullable=False, default=False) # Set while move_user copies the rows
+
+    def __repr__(self):
+        return f'<UserShard User {self.user_id} on {self.shard}>'
+
 class Transcription(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     body = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, index=True, default=db.func.current_timestamp())
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    client_id = db.Column(db.String(64), nullable=True) # Client-generated key that makes saves/syncs idempotent
+    # Packed SegmentIndex (see app/segments.py); deferred so list views never load it
+    segment_index = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    # Running extractive summary state (see app/summarizer.py), used to pre-fill the MoM draft
+    summary_state = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    # Near-duplicate detection (see app/dedup.py)
+    minhash = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('transcription.id'), nullable=True, index=True) # Earliest transcription in the cluster
+    # Set when the body has been moved to the archive tier (see app/archive.py); body is then ''
+    archive_segment = db.Column(db.Integer, nullable=True)
+    archive_offset = db.Column(db.BigInteger, nullable=True)
+    archive_length = db.Column(db.Integer, nullable=True)
 
     user = db.relationship('User', backref=db.backref('transcriptions', lazy=True))
 
+    # Sharded tables never reuse ids: rows moved off a shard (app/sharding.py)
+    # must not hand their ids, and cached fragments, to the next user there.
+    __table_args__ = (db.UniqueConstraint('user_id', 'client_id'), {'sqlite_autoincrement': True})
+
+    @property
+    def is_archived(self):
+        return self.archive_segment is not None
+
+    @property
+    def text(self):
+        """The transcript text, read back from the archive tier if needed."""
+        if not self.is_archived:
+            return self.body
+        from app.archive import read_text
+        return read_text(self.archive_segment, self.archive_offset, self.archive_length)
+
+    def get_segment_index(self):
+        if self.segment_index is None:
+            return None
+        return SegmentIndex.from_bytes(self.segment_index)
+
     def __repr__(self):
         return f'<Transcription {self.id} by User {self.user_id} at {self.timestamp}>'
 
+class LshBucket(db.Model):
+    """One row per (LSH band bucket, transcription); see app/dedup.py."""
+    id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.BigInteger, nullable=False, index=True)
+    transcription_id = db.Column(db.Integer, db.ForeignKey('transcription.id'), nullable=False, index=True)
+
+    __table_args__ = {'sqlite_autoincrement': True}
+
 class MoM(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     summary = db.Column(db.Text, nullable=False) # The actual MoM content
@@ -44,5 +95,40 @@ class MoM(db.Model):
     transcription = db.relationship('Transcription', backref=db.backref('mom', uselist=False, lazy=True)) # one-to-one with Transcription
     user = db.relationship('User', backref=db.backref('moms', lazy=True))
 
+    __table_args__ = {'sqlite_autoincrement': True}
+
     def __repr__(self):
         return f'<MoM {self.id} for Transcription {self.transcription_id} by User {self.user_id}>'
+
+class UserDailyStats(db.Model):
+    """Per-user, per-day aggregates maintained by app/analytics.py."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    meetings = db.Column(db.Integer, nullable=False, default=0) # Transcriptions saved that day
+    words = db.Column(db.Integer, nullable=False, default=0)
+    seconds = db.Column(db.Float, nullable=False, default=0.0) # Recorded time, from segment indexes
+    moms = db.Column(db.Integer, nullable=False, default=0) # Of that day's transcriptions, how many have a MoM
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'day'), {'sqlite_autoincrement': True})
+
+    def __repr__(self):
+        return f'<UserDailyStats {self.day} for User {self.user_id}>'
+
+class SummaryDraft(db.Model):
+    """
+    Summary state of a recording still in progress, fed one final segment
+    at a time through /summary_draft (see app/summarizer.py). Taken over by
+    the Transcription when the recording is saved.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    client_id = db.Column(db.String(64), nullable=False) # The recording's id, as later sent with the save
+    segments_fed = db.Column(db.Integer, nullable=False, default=0)
+    state = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp(), index=True)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'client_id'), {'sqlite_autoincrement': True})
+
+    def __repr__(self):
+        return f'<SummaryDraft {self.client_id} for User {self.user_id}>'
@@ -0,0 +1,217 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from flask_login import current_user
+
+
+class _MemoryLimits:
+    """Token buckets and in-flight count held in this process only (development, tests)."""
+
+    def __init__(self, max_in_flight):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+
+    def take(self, key, rate, burst, now):
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens, retry_after = _refill_and_take(tokens, last, rate, burst, now)
+            self._buckets[key] = (tokens, now)
+        return retry_after
+
+    def enter(self, now):
+        """Claims an in-flight slot; returns a handle for leave(), or None if all are busy."""
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                return None
+            self._in_flight += 1
+            return True
+
+    def leave(self, handle):
+        with self._lock:
+            self._in_flight -= 1
+
+
+class _SharedLimits:
+    """
+    Token buckets and the in-flight write count in a memory-mapped file, so
+    every worker process on the host sees the same counters. The file is a
+    fixed open-addressed table of (key hash, tokens, last refill) slots,
+    followed by max_in_flight (pid, started) slots for running requests, all
+    guarded by flock. When a probe run is full the least recently used
+    bucket slot in it is recycled. In-flight slots of processes that died
+    mid-request (e.g. a worker killed on timeout) are reclaimed.
+    """
+
+    _SLOT = struct.Struct('<Qdd')
+    _IN_FLIGHT_SLOT = struct.Struct('<Id')
+    _PROBES = 8
+    # A request holding a slot longer than this is assumed lost (pid reused)
+    _STALE_AFTER = 600.0
+
+    def __init__(self, path, max_in_flight, slots=4096):
+        self.path = path
+        self.slots = slots
+        self.max_in_flight = max_in_flight
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # Re-open after fork so each worker has its own descriptor and mapping
+        size = self.slots * self._SLOT.size + self.max_in_flight * self._IN_FLIGHT_SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        if os.fstat(fd).st_uid != os.getuid():
+            # Anyone who can write it can fill the slots or reset the buckets
+            os.close(fd)
+            raise PermissionError(f'Rate limit file {self.path} is not owned by the current user')
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._fd = fd
+        self._map = mmap.mmap(fd, size)
+        self._pid = os.getpid()
+
+    @contextmanager
+    def _locked(self):
+        import fcntl
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def take(self, key, rate, burst, now):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        key_hash = int.from_bytes(digest, 'little') or 1  # 0 marks an empty slot
+        with self._locked() as table:
+            offset = self._find_slot(key_hash)
+            stored_hash, tokens, last = self._SLOT.unpack_from(table, offset)
+            if stored_hash != key_hash:
+                tokens, last = burst, now
+            tokens, retry_after = _refill_and_take(tokens, last, rate, burst, now)
+            self._SLOT.pack_into(table, offset, key_hash, tokens, now)
+        return retry_after
+
+    def enter(self, now):
+        """Claims an in-flight slot; returns a handle for leave(), or None if all are busy."""
+        with self._locked() as table:
+            for i in range(self.max_in_flight):
+                offset = self._in_flight_offset(i)
+                pid, started = self._IN_FLIGHT_SLOT.unpack_from(table, offset)
+                if pid == 0 or now - started > self._STALE_AFTER or not _alive(pid):
+                    self._IN_FLIGHT_SLOT.pack_into(table, offset, os.getpid(), now)
+                    return offset
+        return None
+
+    def leave(self, handle):
+        with self._locked() as table:
+            self._IN_FLIGHT_SLOT.pack_into(table, handle, 0, 0.0)
+
+    def _in_flight_offset(self, i):
+        return self.slots * self._SLOT.size + i * self._IN_FLIGHT_SLOT.size
+
+    def _find_slot(self, key_hash):
+        oldest_offset, oldest_last = None, None
+        for probe in range(self._PROBES):
+            offset = ((key_hash + probe) % self.slots) * self._SLOT.size
+            stored_hash, _, last = self._SLOT.unpack_from(self._map, offset)
+            if stored_hash in (key_hash, 0):
+                return offset
+            if oldest_last is None or last < oldest_last:
+                oldest_offset, oldest_last = offset, last
+        return oldest_offset
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass # Exists, owned by someone else
+    return True
+
+
+def _refill_and_take(tokens, last, rate, burst, now):
+    """
+    Classic token bucket step. Returns the new token count and 0 if the
+    request may proceed, otherwise the seconds until a token is available.
+    """
+    tokens = min(burst, tokens + max(0.0, now - last) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class RateLimiter:
+    """
+    Admission control for write endpoints: a token bucket per (user,
+    endpoint) plus a cap on concurrently executing limited requests.
+    Rejections are 429 (over the user's rate) or 503 (server saturated),
+    both with Retry-After. With RATELIMIT_STORAGE_PATH set, both the buckets
+    and the concurrency cap are shared by all worker processes on the host;
+    otherwise they apply per process.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_PER_MINUTE', 30)
+        app.config.setdefault('RATELIMIT_BURST', 10)
+        app.config.setdefault('RATELIMIT_STORAGE_PATH', None)
+        app.config.setdefault('MAX_CONCURRENT_WRITES', 8)
+
+        path = app.config['RATELIMIT_STORAGE_PATH']
+        max_in_flight = app.config['MAX_CONCURRENT_WRITES']
+        app.extensions['ratelimit'] = _SharedLimits(path, max_in_flight) if path else _MemoryLimits(max_in_flight)
+
+    def limit(self, endpoint, methods=('POST',)):
+        def decorator(f):
+            @wraps(f)
+            def wrapped(*args, **kwargs):
+                if request.method not in methods or not current_app.config['RATELIMIT_ENABLED']:
+                    return f(*args, **kwargs)
+                limits = current_app.extensions['ratelimit']
+
+                rate = current_app.config['RATELIMIT_PER_MINUTE'] / 60.0
+                burst = current_app.config['RATELIMIT_BURST']
+                retry_after = limits.take(f'{endpoint}:{current_user.id}', rate, burst, time.time())
+                if retry_after:
+                    return _rejection('Too many requests, please slow down', 429, retry_after)
+
+                handle = limits.enter(time.time())
+                if handle is None:
+                    return _rejection('Server is busy, please retry shortly', 503, 1)
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    limits.leave(handle)
+            return wrapped
+        return decorator
+
+
+def _rejection(message, status, retry_after):
+    if request.is_json:
+        response = jsonify({'status': 'error', 'message': message})
+    else:
+        response = make_response(message)
+    response.status_code = status
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
@@ -0,0 +1,57 @@
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.util import find_tables
+
+# Tables whose rows are partitioned by user across the shard binds. Users and
+# the shard map itself always live in the default database.
+SHARDED_TABLES = frozenset({'transcription', 'mo_m', 'lsh_bucket', 'user_daily_stats', 'summary_draft'})
+# Name under which the default database takes part as a shard
+DEFAULT_SHARD = 'default'
+
+
+def current_shard():
+    if has_app_context():
+        return g.get('shard')
+    return None
+
+
+@contextmanager
+def using_shard(shard):
+    """Routes queries on sharded tables to `shard` for the duration of the block."""
+    previous = g.get('shard')
+    g.shard = shard
+    try:
+        yield
+    finally:
+        g.shard = previous
+
+
+def shard_engine(db, shard):
+    return db.engines[None if shard in (None, DEFAULT_SHARD) else shard]
+
+
+class RoutingSession(Session):
+    """
+    Session that sends statements on sharded tables to the engine of the
+    shard selected for the current request (g.shard), and everything else
+    to the bind Flask-SQLAlchemy would normally pick.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            shard = current_shard()
+            if shard not in (None, DEFAULT_SHARD) and _is_sharded(mapper, clause):
+                return self._db.engines[shard]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_sharded(mapper, clause):
+    if mapper is not None:
+        return sa.inspect(mapper).local_table.name in SHARDED_TABLES
+    if clause is not None:
+        return any(getattr(table, 'name', None) in SHARDED_TABLES
+                   for table in find_tables(clause, include_crud=True))
+    return False
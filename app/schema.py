@@ -0,0 +1,73 @@
+import sqlalchemy as sa
+from flask import current_app
+
+from app import db
+from app.sharding import create_shard_tables, shard_metadata
+
+
+def ensure_schema():
+    """
+    Creates any missing tables and returns what the existing database tables
+    lack compared to the models: columns as 'table.column' and unique keys as
+    'table.unique(col, ...)'. db.create_all() never alters existing tables,
+    so these have to be added (`flask upgrade-schema`) before serving traffic.
+    """
+    db.create_all()
+    create_shard_tables()
+    return [label for _, _, _, label in _schema_gaps()]
+
+
+def upgrade_schema():
+    """
+    Adds the missing nullable columns (with their indexes) and unique keys
+    reported by ensure_schema(). Returns the gaps it cannot fill, e.g. a
+    NOT NULL column without a server default on an existing table.
+    """
+    ensure_schema()
+    left = []
+    for engine, table, missing, label in _schema_gaps():
+        with engine.begin() as conn:
+            if isinstance(missing, sa.Column):
+                if not missing.nullable and missing.server_default is None:
+                    left.append(label)
+                    continue
+                column_ddl = sa.schema.CreateColumn(missing).compile(dialect=engine.dialect)
+                conn.execute(sa.text(f'ALTER TABLE {engine.dialect.identifier_preparer.format_table(table)} '
+                                     f'ADD COLUMN {column_ddl}'))
+                for index in table.indexes:
+                    if any(column is missing for column in index.columns):
+                        index.create(conn)
+            else:
+                # Built on a copy so the model's metadata does not pick up the index.
+                # Fails if existing rows already break the key; those have to be cleaned up first.
+                copy = table.to_metadata(sa.MetaData())
+                sa.Index(f'uq_{table.name}_{"_".join(missing)}', *(copy.c[c] for c in missing),
+                         unique=True).create(conn)
+    return left
+
+
+def _schema_gaps():
+    """Yields (engine, table, column or unique column names, label) per gap."""
+    yield from _table_gaps(db.engine, db.metadata.sorted_tables, '')
+    sharded = shard_metadata().sorted_tables
+    for name in current_app.config['SHARD_BINDS']:
+        yield from _table_gaps(db.engines[name], sharded, f'{name}:')
+
+
+def _table_gaps(engine, tables, prefix):
+    inspector = db.inspect(engine)
+    gaps = []
+    for table in tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        gaps += [(engine, table, column, f'{prefix}{table.name}.{column.name}')
+                 for column in table.columns if column.name not in existing]
+
+        # A unique index enforces the key just as well as a UNIQUE constraint
+        keys = {frozenset(c['column_names']) for c in inspector.get_unique_constraints(table.name)}
+        keys |= {frozenset(i['column_names']) for i in inspector.get_indexes(table.name) if i['unique']}
+        for constraint in table.constraints:
+            if isinstance(constraint, sa.UniqueConstraint):
+                columns = tuple(c.name for c in constraint.columns)
+                if frozenset(columns) not in keys:
+                    gaps.append((engine, table, columns, f'{prefix}{table.name}.unique({", ".join(columns)})'))
+    return gaps
@@ -0,0 +1,131 @@
+import math
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Binary layout: 8-byte header (magic + segment count) followed by four
+# little-endian packed arrays of equal length: start seconds, end seconds
+# (float64) and the character span of each segment in the body (uint32).
+_MAGIC = b'SGI1'
+_HEADER = struct.Struct('<4sI')
+
+
+def _seconds(value):
+    # inf/nan would poison the stats, the JSON responses and the bisect ordering
+    seconds = float(value)
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError(f'Invalid segment time: {value!r}')
+    return seconds
+
+
+class SegmentIndex:
+    """
+    Compact time/character index over the segments of a transcript.
+
+    The index never holds the text itself, only where each segment starts
+    and ends in time and in the stored body, so lookups are a binary search
+    over packed arrays and the caller fetches just the characters it needs.
+    """
+
+    def __init__(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.char_starts = array('I')
+        self.char_ends = array('I')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, start, end, char_start, char_end):
+        start, end = _seconds(start), _seconds(end)
+        if len(self) and (start < self.starts[-1] or char_start < self.char_ends[-1]):
+            raise ValueError('Segments must be appended in time and text order')
+        if end < start or char_end < char_start:
+            raise ValueError('Segment ends before it starts')
+        # Ends are kept non-decreasing so they can be bisected as well.
+        end = max(end, self.ends[-1] if len(self) else 0.0)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.char_starts.append(char_start)
+        self.char_ends.append(char_end)
+
+    @property
+    def duration(self):
+        return self.ends[-1] if len(self) else 0.0
+
+    @classmethod
+    def build(cls, body, segments):
+        """
+        Builds an index from a list of {'text', 'start', 'end'} dicts by
+        locating each segment's text in the saved body, in order.
+        Segments whose text cannot be found in the body are skipped.
+        Raises ValueError for times that are negative, infinite or NaN.
+        """
+        index = cls()
+        cursor = 0
+        # Times are validated up front, before they are used to sort
+        timed = [(_seconds(s['start']), _seconds(s['end']), s) for s in segments]
+        for start, end, segment in sorted(timed, key=lambda t: t[0]):
+            text = (segment.get('text') or '').strip()
+            if not text:
+                continue
+            pos = body.find(text, cursor)
+            if pos == -1:
+                continue
+            cursor = pos + len(text)
+            index.append(start, end, pos, cursor)
+        return index
+
+    def char_range_for_time(self, start, end):
+        """
+        Returns the (char_start, char_end) span covering every segment that
+        overlaps the [start, end) time window, or None if nothing does.
+        """
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        if first >= last:
+            return None
+        return self.char_starts[first], self.char_ends[last - 1]
+
+    def segment_at_char(self, char_pos):
+        """
+        Returns the position of the segment whose text contains char_pos,
+        or None if the offset falls between segments or outside the body.
+        """
+        i = bisect_right(self.char_starts, char_pos) - 1
+        if i < 0 or char_pos >= self.char_ends[i]:
+            return None
+        return i
+
+    def segment(self, i):
+        return {
+            'start': self.starts[i],
+            'end': self.ends[i],
+            'char_start': self.char_starts[i],
+            'char_end': self.char_ends[i],
+        }
+
+    def to_bytes(self):
+        parts = [_HEADER.pack(_MAGIC, len(self))]
+        for arr in (self.starts, self.ends, self.char_starts, self.char_ends):
+            if sys.byteorder != 'little':
+                arr = array(arr.typecode, arr)
+                arr.byteswap()
+            parts.append(arr.tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError('Not a segment index')
+        index = cls()
+        offset = _HEADER.size
+        for arr in (index.starts, index.ends, index.char_starts, index.char_ends):
+            size = count * arr.itemsize
+            arr.frombytes(data[offset:offset + size])
+            if sys.byteorder != 'little':
+                arr.byteswap()
+            offset += size
+        return index
@@ -0,0 +1,221 @@
+import time
+
+import sqlalchemy as sa
+from flask import current_app, g, jsonify, request
+from flask_login import current_user
+
+from app import db, fragment_cache
+from app.cache import dashboard_row_key
+from app.models import UserShard
+from app.routing import SHARDED_TABLES, DEFAULT_SHARD, using_shard, shard_engine
+
+
+def is_enabled():
+    return bool(current_app.config['SHARD_BINDS'])
+
+
+def all_shards():
+    """The default database plus every configured shard bind."""
+    return [DEFAULT_SHARD] + sorted(current_app.config['SHARD_BINDS'])
+
+
+def shard_for_user(user_id):
+    # Users without a map entry predate sharding and live in the default database
+    if not is_enabled():
+        return DEFAULT_SHARD
+    mapping = db.session.get(UserShard, user_id)
+    return mapping.shard if mapping else DEFAULT_SHARD
+
+
+def assign_new_user(user):
+    """Places a newly registered (flushed) user on a shard, spread by id."""
+    if not is_enabled():
+        return
+    shards = all_shards()
+    db.session.add(UserShard(user_id=user.id, shard=shards[user.id % len(shards)]))
+
+
+def select_shard():
+    """before_request hook: route this request's sharded queries to the user's shard."""
+    if not is_enabled() or not current_user.is_authenticated:
+        return None
+    mapping = db.session.get(UserShard, current_user.id)
+    g.shard = mapping.shard if mapping else DEFAULT_SHARD
+    if mapping and mapping.moving and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        # Reads keep working from the old shard while move_user copies the rows
+        response = jsonify({'status': 'error', 'message': 'Your data is being moved, please retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    return None
+
+
+def each_shard():
+    """
+    Yields every shard name with sharded queries routed to it. The session
+    is reset between shards because primary keys are only unique per shard.
+    """
+    for i, shard in enumerate(all_shards()):
+        if i:
+            db.session.remove()
+        with using_shard(shard):
+            yield shard
+
+
+def create_shard_tables():
+    metadata = shard_metadata()
+    for name in current_app.config['SHARD_BINDS']:
+        metadata.create_all(db.engines[name])
+
+
+def shard_metadata():
+    """
+    Copies of the sharded tables as they are created on a shard bind. Foreign
+    keys to tables that only live in the default database (user) are left
+    out: the shard has no such table to reference.
+    """
+    metadata = sa.MetaData()
+    for table in _sharded_tables().values():
+        copy = table.to_metadata(metadata)
+        for constraint in list(copy.foreign_key_constraints):
+            if constraint.elements[0].target_fullname.split('.')[0] not in SHARDED_TABLES:
+                copy.constraints.discard(constraint)
+                for key in constraint.elements:
+                    key.parent.foreign_keys.discard(key)
+                    copy.foreign_keys.discard(key)
+    return metadata
+
+
+def _sharded_tables():
+    return {t.name: t for t in db.metadata.sorted_tables if t.name in SHARDED_TABLES}
+
+
+def move_user(user_id, target, batch_size=500):
+    """
+    Moves all of a user's sharded rows to `target` while the app keeps
+    serving them. The user's writes get a 503 from the moment the move
+    starts; writes that got past that check just before are given
+    SHARD_MOVE_DRAIN_SECONDS (the request timeout) to finish before rows are
+    copied. The copy commits in one target transaction, then the shard map
+    flips and exactly the copied rows are deleted from the source, so a
+    straggling write is left behind (and logged) rather than lost. Rows get
+    new primary keys on the target; references between moved rows are
+    remapped. Returns the number of transcriptions moved.
+    """
+    if target not in all_shards():
+        raise ValueError(f'Unknown shard {target!r}')
+    source = shard_for_user(user_id)
+    if source == target:
+        return 0
+
+    mapping = db.session.get(UserShard, user_id) or UserShard(user_id=user_id, shard=source)
+    mapping.moving = True
+    db.session.add(mapping)
+    db.session.commit()
+    time.sleep(current_app.config['SHARD_MOVE_DRAIN_SECONDS'])
+
+    try:
+        with shard_engine(db, target).begin() as dst, shard_engine(db, source).connect() as src:
+            # Leftovers of an interrupted earlier move (the user was never routed here)
+            _delete_user_rows(dst, user_id)
+            copied = _copy_user_rows(src, dst, user_id, batch_size)
+    except Exception:
+        mapping.moving = False
+        db.session.commit()
+        raise
+
+    mapping.shard = target
+    mapping.moving = False
+    db.session.commit()
+
+    transcription = _sharded_tables()['transcription']
+    with shard_engine(db, source).begin() as src:
+        _delete_copied_rows(src, user_id, copied)
+        left = src.execute(sa.select(sa.func.count(transcription.c.id))
+                             .where(transcription.c.user_id == user_id)).scalar()
+    if left:
+        current_app.logger.warning('move_user: %d transcriptions of user %d were written to %s during the move '
+                                   'and were not moved', left, user_id, source)
+    for old_id in copied['transcription']:
+        fragment_cache.invalidate(dashboard_row_key(source, user_id, old_id))
+    return len(copied['transcription'])
+
+
+def _copy_user_rows(src, dst, user_id, batch_size):
+    """Copies the user's rows from src to dst; returns the copied source ids per table."""
+    tables = _sharded_tables()
+    transcription, mom, lsh, stats = (tables[name] for name in ('transcription', 'mo_m', 'lsh_bucket', 'user_daily_stats'))
+
+    id_map = {}
+    duplicates = []
+    last_id = 0
+    while True:
+        rows = src.execute(sa.select(transcription)
+                             .where(transcription.c.user_id == user_id, transcription.c.id > last_id)
+                             .order_by(transcription.c.id).limit(batch_size)).mappings().all()
+        if not rows:
+            break
+        values = [{k: v for k, v in row.items() if k not in ('id', 'duplicate_of_id')} for row in rows]
+        new_ids = dst.execute(transcription.insert().returning(transcription.c.id, sort_by_parameter_order=True),
+                              values).scalars().all()
+        batch_map = {row['id']: new_id for row, new_id in zip(rows, new_ids)}
+        id_map.update(batch_map)
+        duplicates += [(batch_map[row['id']], row['duplicate_of_id']) for row in rows if row['duplicate_of_id']]
+
+        buckets = src.execute(sa.select(lsh.c.bucket, lsh.c.transcription_id)
+                                .where(lsh.c.transcription_id.in_(list(batch_map)))).all()
+        if buckets:
+            dst.execute(lsh.insert(), [{'bucket': b, 'transcription_id': batch_map[t]} for b, t in buckets])
+        last_id = rows[-1]['id']
+
+    # Duplicate links survive only when both ends moved together
+    for new_id, old_target in duplicates:
+        if old_target in id_map:
+            dst.execute(transcription.update().where(transcription.c.id == new_id)
+                                     .values(duplicate_of_id=id_map[old_target]))
+
+    copied = {'transcription': list(id_map)}
+    for table, remap in ((mom, True), (stats, False)):
+        rows = src.execute(sa.select(table).where(table.c.user_id == user_id)).mappings().all()
+        if remap:
+            # A MoM whose transcription was written after the copy stays with it
+            rows = [row for row in rows if row['transcription_id'] in id_map]
+        values = [{k: v for k, v in row.items() if k != 'id'} for row in rows]
+        if remap:
+            for value in values:
+                value['transcription_id'] = id_map[value['transcription_id']]
+        if values:
+            dst.execute(table.insert(), values)
+        copied[table.name] = [row['id'] for row in rows]
+    return copied
+
+
+def _delete_user_rows(conn, user_id):
+    tables = _sharded_tables()
+    transcription = tables['transcription']
+    owned = sa.select(transcription.c.id).where(transcription.c.user_id == user_id)
+    conn.execute(transcription.update().where(transcription.c.duplicate_of_id.in_(owned))
+                              .values(duplicate_of_id=None))
+    conn.execute(tables['lsh_bucket'].delete().where(tables['lsh_bucket'].c.transcription_id.in_(owned)))
+    conn.execute(tables['mo_m'].delete().where(tables['mo_m'].c.user_id == user_id))
+    conn.execute(tables['user_daily_stats'].delete().where(tables['user_daily_stats'].c.user_id == user_id))
+    # Drafts of recordings in progress are not copied; their saves fall back to a full pass
+    conn.execute(tables['summary_draft'].delete().where(tables['summary_draft'].c.user_id == user_id))
+    conn.execute(transcription.delete().where(transcription.c.user_id == user_id))
+
+
+def _delete_copied_rows(conn, user_id, copied, chunk=500):
+    # Only what was copied; anything written meanwhile stays where it is
+    tables = _sharded_tables()
+    transcription = tables['transcription']
+    ids = copied['transcription']
+    for i in range(0, len(ids), chunk):
+        part = ids[i:i + chunk]
+        conn.execute(transcription.update().where(transcription.c.duplicate_of_id.in_(part))
+                                  .values(duplicate_of_id=None))
+        conn.execute(tables['lsh_bucket'].delete().where(tables['lsh_bucket'].c.transcription_id.in_(part)))
+    for name in ('mo_m', 'user_daily_stats', 'transcription'):
+        table = tables[name]
+        for i in range(0, len(copied[name]), chunk):
+            conn.execute(table.delete().where(table.c.id.in_(copied[name][i:i + chunk])))
+    conn.execute(tables['summary_draft'].delete().where(tables['summary_draft'].c.user_id == user_id))
@@ -0,0 +1,123 @@
+import heapq
+import json
+import math
+import re
+import zlib
+from collections import Counter
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been but by can could did do does
+for from had has have he her here him his how i if in into is it its just let like me more my
+no not now of on or our out over she so some than that the their them then there these they
+this those to too up us very was we well were what when where which who will with would yes
+you your okay ok yeah um uh going get got know think really right
+""".split())
+
+
+def _content_terms(sentence):
+    return [w for w in _WORD_RE.findall(sentence.lower()) if w not in _STOPWORDS]
+
+
+class IncrementalSummarizer:
+    """
+    Extractive summary maintained while a transcript is being recorded.
+
+    feed() takes one final speech segment and does work proportional to
+    that segment only: it completes sentences, updates running term counts
+    and offers each new sentence to a bounded heap of candidates scored by
+    the terms seen so far. summary() re-scores just those candidates against
+    the final term counts, so producing the draft never re-reads the text.
+    """
+
+    VERSION = 1
+
+    def __init__(self, num_sentences=3, max_chars=300, max_pending_chars=300):
+        self.num_sentences = num_sentences
+        self.max_chars = max_chars
+        self.max_pending_chars = max_pending_chars
+        self.pending = ''
+        self.seq = 0
+        self.terms = Counter()
+        self.candidates = [] # min-heap of (score, seq, sentence)
+
+    @property
+    def max_candidates(self):
+        return self.num_sentences * 4
+
+    def feed(self, segment):
+        text = (self.pending + ' ' + segment).strip() if self.pending else segment.strip()
+        parts = _SENTENCE_END_RE.split(text) if text else []
+        # The last piece may be a sentence still being spoken
+        self.pending = parts.pop() if parts and not parts[-1].endswith(('.', '!', '?')) else ''
+        if len(self.pending) > self.max_pending_chars:
+            # Recognisers often emit no punctuation at all; don't buffer forever
+            parts.append(self.pending)
+            self.pending = ''
+        for sentence in parts:
+            self._add_sentence(sentence)
+
+    def _add_sentence(self, sentence):
+        terms = _content_terms(sentence)
+        self.terms.update(terms)
+        entry = (self._score(terms), self.seq, sentence)
+        self.seq += 1
+        if len(self.candidates) < self.max_candidates:
+            heapq.heappush(self.candidates, entry)
+        elif entry > self.candidates[0]:
+            heapq.heapreplace(self.candidates, entry)
+
+    def _score(self, terms):
+        distinct = set(terms)
+        if not distinct:
+            return 0.0
+        return sum(math.log1p(self.terms[t]) for t in distinct) / math.sqrt(len(terms))
+
+    def summary(self):
+        """Returns the current draft summary without changing the state."""
+        candidates = [(score, seq, sentence) for score, seq, sentence in self.candidates]
+        if self.pending:
+            candidates.append((0.0, self.seq, self.pending))
+        rescored = sorted(candidates, key=lambda c: self._score(_content_terms(c[2])), reverse=True)
+        chosen = sorted(rescored[:self.num_sentences], key=lambda c: c[1])
+
+        summary_sentences = []
+        current_char_count = 0
+        for _, _, sentence in chosen:
+            if current_char_count + len(sentence) <= self.max_chars:
+                summary_sentences.append(sentence)
+                current_char_count += len(sentence) + 1
+            else:
+                remaining_chars = self.max_chars - current_char_count
+                if remaining_chars > 10:
+                    summary_sentences.append(sentence[:remaining_chars - 3] + "...")
+                break
+        return " ".join(summary_sentences)
+
+    def to_bytes(self):
+        state = {
+            'v': self.VERSION,
+            'n': self.num_sentences,
+            'c': self.max_chars,
+            'm': self.max_pending_chars,
+            'p': self.pending,
+            's': self.seq,
+            't': self.terms,
+            'h': self.candidates,
+        }
+        return zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, data):
+        state = json.loads(zlib.decompress(data))
+        if state['v'] != cls.VERSION:
+            raise ValueError('Unsupported summarizer state version')
+        # 'm' was added after version 1 shipped; older states used the default
+        summarizer = cls(num_sentences=state['n'], max_chars=state['c'], max_pending_chars=state.get('m', 300))
+        summarizer.pending = state['p']
+        summarizer.seq = state['s']
+        summarizer.terms = Counter(state['t'])
+        summarizer.candidates = [tuple(entry) for entry in state['h']]
+        heapq.heapify(summarizer.candidates)
+        return summarizer
@@ -0,0 +1,53 @@
+# Gunicorn settings for serving the app in production:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+# Every value can be overridden through the environment.
+import multiprocessing
+import os
+import re
+
+bind = os.environ.get('BIND') or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 1)
+
+# Rate limits and the write concurrency cap must be shared by all workers,
+# or each worker enforces its own copy. Set before the app (and its config)
+# is imported; the file lives in the app's private instance folder (the one
+# Flask uses for this package), one per bind address so separate instances
+# stay apart.
+_instance_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+os.makedirs(_instance_dir, mode=0o700, exist_ok=True)
+os.environ.setdefault('RATELIMIT_STORAGE_PATH',
+                      os.path.join(_instance_dir, 'ratelimit-' + re.sub(r'\W', '_', bind)))
+
+# Import the app in the master before forking, so workers share its memory
+# pages and start instantly.
+preload_app = True
+
+# Recycle each worker after this many requests (with jitter so they do not
+# all restart at once) to bound memory growth.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 1000)
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER') or 100)
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT') or 30)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE') or 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or '-'
+
+
+def on_starting(server):
+    # Runs once in the master, after the preloaded app has been imported and
+    # before any worker is forked.
+    from wsgi import app
+    from app import db
+    from app.schema import ensure_schema
+
+    with app.app_context():
+        missing = ensure_schema()
+        # Do not hand pooled connections (default database and every shard)
+        # down to the forked workers
+        for engine in db.engines.values():
+            engine.dispose()
+    if missing:
+        raise SystemExit('Database schema is out of date, missing: ' + ', '.join(missing)
+                         + '. Run `flask upgrade-schema` to add them.')
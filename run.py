@@ -1,5 +1,7 @@
+import os
 from app import create_app, db
 from app.models import User, Transcription, MoM # Import your models
+from app.schema import ensure_schema
 
 app = create_app()
 
@@ -8,6 +10,9 @@ def make_shell_context():
     return {'db': db, 'User': User, 'Transcription': Transcription, 'MoM': MoM}
 
 if __name__ == '__main__':
+    # Development server only; use gunicorn.conf.py / wsgi.py in production
     with app.app_context():
-        db.create_all() # Creates database tables from models, if they don't exist
-    app.run(debug=True)
+        missing = ensure_schema() # Creates database tables from models, if they don't exist
+        if missing:
+            app.logger.warning('Database is missing %s; run `flask upgrade-schema`', ', '.join(missing))
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1')
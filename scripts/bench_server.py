@@ -0,0 +1,85 @@
+"""
+Closed-loop throughput benchmark for a locally running server.
+
+Start the server under test, e.g. the dev server:
+    python run.py
+or the production setup:
+    gunicorn -c gunicorn.conf.py wsgi:app
+then point this script at it:
+    python scripts/bench_server.py http://127.0.0.1:5000/ --concurrency 16 --duration 10
+
+Each client thread keeps one HTTP/1.1 connection open (keep-alive) and
+issues GET requests back to back; the totals are printed at the end.
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def worker(url, deadline, results):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    conn = None
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        if conn is None:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = None
+            continue
+        latencies.append(time.perf_counter() - started)
+    if conn is not None:
+        conn.close()
+    results.append((latencies, errors))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    args = parser.parse_args()
+
+    results = []
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=worker, args=(args.url, deadline, results)) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(l for thread_latencies, _ in results for l in thread_latencies)
+    errors = sum(e for _, e in results)
+    print(f'requests:   {len(latencies)} in {elapsed:.1f}s ({len(latencies) / elapsed:.1f} req/s)')
+    print(f'errors:     {errors}')
+    for pct in (50, 90, 99):
+        print(f'p{pct}:        {percentile(latencies, pct) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
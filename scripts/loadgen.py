@@ -0,0 +1,302 @@
+"""
+Open-loop load generator that simulates people using the app end to end.
+
+Start the server under test, e.g.
+    gunicorn -c gunicorn.conf.py wsgi:app
+then run, for example:
+    python scripts/loadgen.py http://127.0.0.1:8000 --rate 5 --concurrency 500 --duration 300
+
+Virtual sessions arrive as a Poisson process at --rate per second, up to
+--concurrency at once (arrivals beyond that are counted as dropped, so an
+overloaded server shows up in the report instead of slowing the arrivals
+down). Each session picks one of --accounts test accounts (registered on
+first use), then like a real user:
+
+    log in -> open the transcribe page -> record and save 1..N transcripts
+    -> browse dashboard pages -> open some transcripts' MoM page and save it
+    -> log out
+
+Transcript lengths follow a log-normal distribution (--median-words,
+--sigma). While recording, each final segment is fed to /summary_draft as
+the page does (one request in flight, carrying every segment the server has
+not taken yet, honouring Retry-After), played back --recording-speed times
+faster than real time; the transcript is then saved with per-segment
+timings under the same client id.
+Every --interval seconds a line with throughput, error rate, rate-limited
+(429) responses and p50/p90/p99 latency is printed, followed by a per-step
+summary at the end. Think times are scaled by --think.
+"""
+import argparse
+import math
+import random
+import re
+import threading
+import time
+import uuid
+
+import requests
+
+from bench_server import percentile # Same percentile definition as the throughput benchmark
+
+CSRF_RE = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+MOM_LINK_RE = re.compile(r'href="(/transcription/\d+/mom)"')
+PAGE_LINK_RE = re.compile(r'[?&]page=(\d+)')
+
+WORDS = ('we', 'the', 'team', 'project', 'deadline', 'budget', 'review', 'design', 'customer', 'release',
+         'agreed', 'should', 'next', 'week', 'meeting', 'action', 'item', 'follow', 'up', 'on', 'update',
+         'plan', 'risk', 'owner', 'testing', 'deploy', 'feedback', 'priority', 'schedule', 'data', 'report',
+         'need', 'to', 'and', 'for', 'with', 'this', 'that', 'will', 'is')
+WORDS_PER_SECOND = 2.5 # Roughly conversational speech
+WORDS_PER_SEGMENT = 12 # One recognition result from the Web Speech API
+
+# Sessions for the same account must not race to register it
+_account_locks = {}
+
+
+class Stats:
+    """Thread-safe request log; drained once per reporting interval."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._interval = []
+        self._totals = {} # step -> [latencies, errors, limited]
+        self.active = 0
+        self.sessions = self.dropped = self.failed_sessions = 0
+
+    def record(self, step, latency, status):
+        error = status is None or (status >= 400 and status != 429)
+        with self._lock:
+            self._interval.append((latency, error, status == 429))
+            totals = self._totals.setdefault(step, [[], 0, 0])
+            totals[0].append(latency)
+            totals[1] += error
+            totals[2] += status == 429
+
+    def count(self, field, delta=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def drain(self):
+        with self._lock:
+            interval, self._interval = self._interval, []
+            return interval, self.active
+
+    def totals(self):
+        with self._lock:
+            return {step: (sorted(l), e, r) for step, (l, e, r) in self._totals.items()}
+
+
+class VirtualUser:
+    """One browser session: a requests.Session with its own cookie jar."""
+
+    def __init__(self, base_url, username, password, stats, args, rng):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.stats = stats
+        self.args = args
+        self.rng = rng
+        self.http = requests.Session()
+
+    def request(self, step, method, path, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', self.args.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, **kwargs)
+        except requests.RequestException:
+            self.stats.record(step, time.perf_counter() - started, None)
+            raise
+        self.stats.record(step, time.perf_counter() - started, response.status_code)
+        return response
+
+    def think(self, mean_seconds):
+        if self.args.think > 0:
+            time.sleep(self.rng.expovariate(1.0 / (mean_seconds * self.args.think)))
+
+    def _form_token(self, step, path):
+        match = CSRF_RE.search(self.request(step, 'GET', path).text)
+        return match.group(1) if match else ''
+
+    def login(self):
+        token = self._form_token('login_form', '/auth/login')
+        response = self.request('login', 'POST', '/auth/login',
+                                data={'csrf_token': token, 'username': self.username, 'password': self.password})
+        # Failed logins redirect back to the login page
+        return response.status_code == 302 and '/auth/login' not in response.headers.get('Location', '')
+
+    def register(self):
+        token = self._form_token('register_form', '/auth/register')
+        self.request('register', 'POST', '/auth/register',
+                     data={'csrf_token': token, 'username': self.username, 'email': f'{self.username}@example.com',
+                           'password': self.password, 'password2': self.password})
+
+    def transcript(self):
+        words = max(1, int(self.rng.lognormvariate(math.log(self.args.median_words), self.args.sigma)))
+        segments, start = [], 0.0
+        for i in range(0, words, WORDS_PER_SEGMENT):
+            n = min(WORDS_PER_SEGMENT, words - i)
+            text = ' '.join(self.rng.choice(WORDS) for _ in range(n)).capitalize() + '.'
+            end = start + n / WORDS_PER_SECOND
+            segments.append({'text': text, 'start': round(start, 2), 'end': round(end, 2)})
+            start = end
+        return {'client_id': str(uuid.uuid4()), 'transcription': ' '.join(s['text'] for s in segments),
+                'segments': segments}
+
+    def record(self, transcript):
+        """Plays the recording back, feeding its running summary like the transcribe page."""
+        segments = transcript['segments']
+        started = time.perf_counter()
+        fed = 0
+        for arrived, segment in enumerate(segments, 1):
+            if self.args.think > 0:
+                due = started + segment['end'] * self.args.think / self.args.recording_speed
+                time.sleep(max(0.0, due - time.perf_counter()))
+            while fed < arrived:
+                try:
+                    response = self.request('summary_draft', 'POST', '/summary_draft',
+                                            json={'client_id': transcript['client_id'], 'offset': fed,
+                                                  'segments': segments[fed:arrived]})
+                except requests.RequestException:
+                    break # Next segment tries again
+                if response.status_code in (429, 503):
+                    time.sleep(float(response.headers.get('Retry-After') or 1))
+                elif response.status_code == 200:
+                    fed = response.json()['segments_fed']
+                elif response.status_code == 409:
+                    fed = min(fed, response.json()['segments_fed']) # Resend from where the server is
+                else:
+                    break # Not retried; the save builds the summary itself
+
+    def run(self):
+        if not self.login():
+            with _account_locks.setdefault(self.username, threading.Lock()):
+                if not self.login():
+                    self.register()
+                    if not self.login():
+                        raise RuntimeError(f'Could not log in as {self.username}')
+        self.think(2)
+        self.request('transcribe', 'GET', '/transcribe')
+
+        for _ in range(self.rng.randint(1, self.args.max_transcripts)):
+            transcript = self.transcript()
+            self.record(transcript)
+            self.request('save_transcription', 'POST', '/save_transcription', json=transcript)
+
+        html = self.request('dashboard', 'GET', '/dashboard').text
+        pages = sorted({int(p) for p in PAGE_LINK_RE.findall(html)} - {1})
+        for page in self.rng.sample(pages, min(len(pages), self.rng.randint(0, 2))):
+            self.think(2)
+            self.request('dashboard', 'GET', '/dashboard', params={'page': page})
+
+        links = list(dict.fromkeys(MOM_LINK_RE.findall(html)))
+        for path in self.rng.sample(links, min(len(links), self.rng.randint(0, 2))):
+            self.think(3)
+            page = self.request('mom_form', 'GET', path).text
+            match = CSRF_RE.search(page)
+            self.think(5) # Editing the draft
+            self.request('save_mom', 'POST', path,
+                         data={'csrf_token': match.group(1) if match else '',
+                               'summary': 'Minutes: ' + ' '.join(self.rng.choice(WORDS) for _ in range(40))})
+        self.request('logout', 'GET', '/auth/logout')
+
+
+def run_session(args, stats, slots, session_number):
+    rng = random.Random(None if args.seed is None else args.seed + session_number)
+    username = f'{args.user_prefix}{rng.randrange(args.accounts)}'
+    try:
+        VirtualUser(args.url, username, args.password, stats, args, rng).run()
+    except (requests.RequestException, RuntimeError):
+        stats.count('failed_sessions')
+    finally:
+        stats.count('active', -1)
+        slots.release()
+
+
+def report_line(elapsed, interval, samples, active):
+    latencies = sorted(s[0] for s in samples)
+    errors = sum(1 for s in samples if s[1])
+    limited = sum(1 for s in samples if s[2])
+    error_pct = 100.0 * errors / len(samples) if samples else 0.0
+    return (f'{elapsed:7.1f}s  active {active:4d}  {len(samples) / interval:8.1f} req/s  '
+            f'errors {error_pct:5.1f}%  429s {limited:5d}  '
+            f'p50 {percentile(latencies, 50) * 1000:7.1f}  p90 {percentile(latencies, 90) * 1000:7.1f}  '
+            f'p99 {percentile(latencies, 99) * 1000:7.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url')
+    parser.add_argument('--rate', type=float, default=2.0, help='new sessions per second (Poisson arrivals)')
+    parser.add_argument('--concurrency', type=int, default=100, help='most sessions running at once')
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds to keep starting sessions')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between report lines')
+    parser.add_argument('--accounts', type=int, default=200, help='size of the test account pool')
+    parser.add_argument('--user-prefix', default='loadgen')
+    parser.add_argument('--password', default='loadgen-password')
+    parser.add_argument('--median-words', type=float, default=400, help='median transcript length')
+    parser.add_argument('--sigma', type=float, default=0.9, help='log-normal spread of transcript length')
+    parser.add_argument('--recording-speed', type=float, default=10.0,
+                        help='how many times faster than real time recordings are played back')
+    parser.add_argument('--max-transcripts', type=int, default=3, help='most transcripts saved per session')
+    parser.add_argument('--think', type=float, default=1.0, help='think time scale (0 disables pauses)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per request, seconds')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    if args.recording_speed <= 0:
+        parser.error('--recording-speed must be positive')
+
+    stats = Stats()
+    slots = threading.BoundedSemaphore(args.concurrency)
+    arrivals = random.Random(args.seed)
+    threads = []
+    started = time.perf_counter()
+    last_report = started
+    next_arrival = started
+    deadline = started + args.duration
+
+    print(f'Load test against {args.url}: {args.rate}/s arrivals, up to {args.concurrency} sessions, {args.duration:.0f}s')
+    while True:
+        now = time.perf_counter()
+        if now - last_report >= args.interval:
+            samples, active = stats.drain()
+            print(report_line(now - started, now - last_report, samples, active), flush=True)
+            last_report = now
+        if now >= deadline:
+            if stats.active == 0:
+                break
+            time.sleep(0.1)
+            continue
+        if now >= next_arrival:
+            next_arrival += arrivals.expovariate(args.rate)
+            if slots.acquire(blocking=False):
+                stats.count('active')
+                stats.count('sessions')
+                thread = threading.Thread(target=run_session, args=(args, stats, slots, stats.sessions), daemon=True)
+                thread.start()
+                threads.append(thread)
+            else:
+                stats.count('dropped')
+            continue
+        time.sleep(max(0.0, min(next_arrival, last_report + args.interval, deadline) - now))
+
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    samples, _ = stats.drain()
+    if samples:
+        print(report_line(elapsed, time.perf_counter() - last_report, samples, 0))
+
+    totals = stats.totals()
+    requests_made = sum(len(l) for l, _, _ in totals.values())
+    print(f'\nsessions: {stats.sessions} started, {stats.failed_sessions} failed, {stats.dropped} dropped at the concurrency cap')
+    print(f'requests: {requests_made} in {elapsed:.1f}s ({requests_made / elapsed:.1f} req/s)')
+    print(f'{"step":<20} {"count":>7} {"errors":>7} {"429s":>6} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8}')
+    for step, (latencies, errors, limited) in sorted(totals.items()):
+        print(f'{step:<20} {len(latencies):7d} {errors:7d} {limited:6d} '
+              f'{percentile(latencies, 50) * 1000:8.1f} {percentile(latencies, 90) * 1000:8.1f} '
+              f'{percentile(latencies, 99) * 1000:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+from tests.base_test import BaseTestCase, db
+from app.models import User, Transcription, UserDailyStats
+
+
+class TestAnalyticsAggregates(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.query.filter_by(username="testuser").first()
+        self.login()
+
+    def test_save_updates_daily_aggregate(self):
+        self.client.post('/save_transcription', json={'transcription': 'one two three'})
+        self.client.post('/save_transcription', json={
+            'transcription': 'four five',
+            'segments': [{'text': 'four five', 'start': 0, 'end': 90}],
+        })
+        stats = UserDailyStats.query.filter_by(user_id=self.user.id).one()
+        self.assertEqual(stats.meetings, 2)
+        self.assertEqual(stats.words, 5)
+        self.assertEqual(stats.seconds, 90.0)
+        self.assertEqual(stats.moms, 0)
+
+    def test_day_matches_stored_timestamp(self):
+        self.client.post('/save_transcription', json={'transcription': 'one two three'})
+        stats = UserDailyStats.query.filter_by(user_id=self.user.id).one()
+        self.assertEqual(stats.day, Transcription.query.one().timestamp.date())
+
+    def test_creating_mom_counts_once(self):
+        self.client.post('/save_transcription', json={'transcription': 'Needs minutes.'})
+        trans = Transcription.query.first()
+        self.client.post(f'/transcription/{trans.id}/mom', data={'summary': 'First'})
+        self.client.post(f'/transcription/{trans.id}/mom', data={'summary': 'Edited'})
+        stats = UserDailyStats.query.filter_by(user_id=self.user.id).one()
+        self.assertEqual(stats.moms, 1)
+
+    def test_rebuild_matches_incremental(self):
+        for text in ('alpha beta', 'gamma delta epsilon', 'zeta'):
+            self.client.post('/save_transcription', json={'transcription': text})
+        trans = Transcription.query.first()
+        self.client.post(f'/transcription/{trans.id}/mom', data={'summary': 'Minutes'})
+        incremental = UserDailyStats.query.filter_by(user_id=self.user.id).one()
+        expected = (incremental.meetings, incremental.words, incremental.moms)
+
+        UserDailyStats.query.delete()
+        db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=['rebuild-stats', '--batch-size', '2'])
+        self.assertIn('Rebuilt analytics from 3 transcriptions.', result.output)
+        rebuilt = UserDailyStats.query.filter_by(user_id=self.user.id).one()
+        self.assertEqual((rebuilt.meetings, rebuilt.words, rebuilt.moms), expected)
+        self.assertEqual(expected, (3, 6, 1))
+
+    def test_analytics_page_reads_aggregates(self):
+        # Rows added directly bypass the write path, so they must not show up
+        db.session.add(Transcription(body='not counted', user_id=self.user.id))
+        db.session.commit()
+        self.client.post('/save_transcription', json={'transcription': 'counted words here'})
+        response = self.client.get('/analytics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'My Meeting Analytics', response.data)
+        self.assertIn(b'<h4>1</h4><small>Meetings</small>', response.data)
+        self.assertIn(b'<h4>3</h4><small>Words</small>', response.data)
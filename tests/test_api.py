@@ -0,0 +1,59 @@
+from tests.base_test import BaseTestCase, db
+from app.models import User, Transcription, MoM
+
+
+class TestBatchReadApi(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.query.filter_by(username="testuser").first()
+        other = self.create_test_user(username="other", email="other@example.com")
+        self.mine = [Transcription(body=f"Transcript {i} " + "x" * 200, user_id=self.user.id) for i in range(3)]
+        self.theirs = Transcription(body="Someone else's transcript.", user_id=other.id)
+        db.session.add_all(self.mine + [self.theirs])
+        db.session.commit()
+        self.mom = MoM(summary="Minutes for transcript 0.", transcription_id=self.mine[0].id, user_id=self.user.id)
+        db.session.add(self.mom)
+        db.session.commit()
+        self.login()
+
+    def test_sparse_fields_in_requested_order(self):
+        ids = f'{self.mine[2].id},{self.mine[0].id}'
+        response = self.client.get(f'/api/transcriptions?ids={ids}&fields=id,preview')
+        self.assertEqual(response.status_code, 200)
+        payload = response.get_json()
+        self.assertEqual([item['id'] for item in payload['data']], [self.mine[2].id, self.mine[0].id])
+        self.assertEqual(set(payload['data'][0]), {'id', 'preview'})
+        self.assertEqual(len(payload['data'][0]['preview']), 150)
+        self.assertEqual(payload['errors'], [])
+
+    def test_default_fields_exclude_body(self):
+        payload = self.client.get(f'/api/transcriptions?ids={self.mine[0].id}').get_json()
+        self.assertEqual(set(payload['data'][0]), {'id', 'timestamp', 'preview'})
+
+    def test_foreign_and_missing_ids_are_not_found(self):
+        payload = self.client.get(f'/api/transcriptions?ids={self.mine[1].id},{self.theirs.id},9999&fields=body').get_json()
+        self.assertEqual(payload['data'], [{'body': self.mine[1].body}])
+        self.assertEqual(payload['errors'], [{'id': self.theirs.id, 'error': 'not_found'},
+                                             {'id': 9999, 'error': 'not_found'}])
+
+    def test_moms_batch(self):
+        payload = self.client.get(f'/api/moms?ids={self.mom.id}&fields=transcription_id,summary').get_json()
+        self.assertEqual(payload['data'], [{'transcription_id': self.mine[0].id, 'summary': 'Minutes for transcript 0.'}])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/transcriptions').status_code, 400)
+        self.assertEqual(self.client.get('/api/transcriptions?ids=1,abc').status_code, 400)
+        response = self.client.get('/api/transcriptions?ids=1&fields=id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unknown fields: password', response.get_json()['message'])
+        self.app.config['API_MAX_IDS'] = 2
+        self.assertEqual(self.client.get('/api/moms?ids=1,2,3').status_code, 400)
+        self.assertEqual(self.client.get('/api/transcriptions?ids=99999999999999999999999').status_code, 400)
+        self.assertEqual(self.client.get('/api/moms?ids=0').status_code, 400)
+
+    def test_unauthenticated_gets_json_401(self):
+        self.logout()
+        response = self.client.get(f'/api/transcriptions?ids={self.mine[0].id}')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.get_json()['status'], 'error')
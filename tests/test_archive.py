@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from tests.base_test import BaseTestCase, db
+from app.models import User, Transcription
+from app.archive import ArchiveStore
+
+
+class TestArchiveStore(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        super().tearDown()
+
+    def test_append_and_read_back(self):
+        store = ArchiveStore(self.tmp, segment_bytes=1024 * 1024)
+        with store.writer() as writer:
+            first = writer.append(1, 'First archived transcript.')
+            second = writer.append(2, 'Second one, ünïcode included.')
+        self.assertEqual(store.read(*first), 'First archived transcript.')
+        self.assertEqual(store.read(*second), 'Second one, ünïcode included.')
+
+    def test_rotates_segments_and_remaps_growing_file(self):
+        store = ArchiveStore(self.tmp, segment_bytes=64)
+        first_text, second_text = os.urandom(100).hex(), os.urandom(100).hex() # Barely compressible
+        with store.writer() as writer:
+            a = writer.append(1, first_text)
+        self.assertEqual(store.read(*a), first_text)
+        with store.writer() as writer:
+            b = writer.append(2, second_text)
+        self.assertNotEqual(a[0], b[0])
+        self.assertEqual(store.read(*b), second_text)
+        self.assertEqual(len(os.listdir(self.tmp)), 2)
+
+    def test_corruption_is_detected(self):
+        store = ArchiveStore(self.tmp, segment_bytes=1024)
+        with store.writer() as writer:
+            segment, offset, length = writer.append(1, 'Some text to corrupt.')
+        with self.assertRaises(ValueError):
+            store.read(segment, offset + 1, length)
+
+
+class TestArchiveCommands(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.app.config['ARCHIVE_DIR'] = self.tmp
+        user = User.query.filter_by(username="testuser").first()
+        self.old = Transcription(body="An old meeting nobody reads. It is long enough.", user_id=user.id,
+                                 timestamp=datetime.utcnow() - timedelta(days=60))
+        self.recent = Transcription(body="Yesterday's meeting.", user_id=user.id,
+                                    timestamp=datetime.utcnow() - timedelta(days=1))
+        db.session.add_all([self.old, self.recent])
+        db.session.commit()
+        self.runner = self.app.test_cli_runner()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        super().tearDown()
+
+    def test_archive_by_age_leaves_stub(self):
+        result = self.runner.invoke(args=['archive-transcripts', '--days', '30'])
+        self.assertIn('Archived 1 transcriptions.', result.output)
+        old = db.session.get(Transcription, self.old.id)
+        self.assertTrue(old.is_archived)
+        self.assertEqual(old.body, '')
+        self.assertEqual(old.text, "An old meeting nobody reads. It is long enough.")
+        self.assertFalse(db.session.get(Transcription, self.recent.id).is_archived)
+
+    def test_manage_mom_reads_archived_text(self):
+        self.runner.invoke(args=['archive-transcripts', '--days', '30'])
+        self.login()
+        response = self.client.get(f'/transcription/{self.old.id}/mom')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'An old meeting nobody reads.', response.data)
+
+    def test_restore_puts_body_back(self):
+        self.runner.invoke(args=['archive-transcripts', '--days', '0'])
+        result = self.runner.invoke(args=['restore-transcripts', '--days', '30'])
+        self.assertIn('Restored 1 transcriptions.', result.output)
+        self.assertEqual(db.session.get(Transcription, self.recent.id).body, "Yesterday's meeting.")
+        self.assertTrue(db.session.get(Transcription, self.old.id).is_archived)
+        result = self.runner.invoke(args=['restore-transcripts'])
+        self.assertIn('Restored 1 transcriptions.', result.output)
+        old = db.session.get(Transcription, self.old.id)
+        self.assertFalse(old.is_archived)
+        self.assertEqual(old.body, "An old meeting nobody reads. It is long enough.")
@@ -0,0 +1,68 @@
+import os
+import tempfile
+
+from tests.base_test import BaseTestCase, db
+from app.models import User, Transcription
+from app.cache import _FragmentStore
+
+
+class TestFragmentStore(BaseTestCase):
+
+    def test_lru_eviction_and_counters(self):
+        store = _FragmentStore(max_entries=2)
+        store.set('a', 'v1', 'A')
+        store.set('b', 'v1', 'B')
+        self.assertEqual(store.get('a', 'v1'), 'A') # 'b' is now least recently used
+        store.set('c', 'v1', 'C')
+        self.assertIsNone(store.get('b', 'v1'))
+        self.assertEqual(store.get('c', 'v1'), 'C')
+        self.assertEqual(store.stats()['hits'], 2)
+        self.assertEqual(store.stats()['misses'], 1)
+        self.assertEqual(store.stats()['entries'], 2)
+
+    def test_version_mismatch_is_a_miss(self):
+        store = _FragmentStore(max_entries=10)
+        store.set('a', 'v1', 'A')
+        self.assertIsNone(store.get('a', 'v2'))
+
+    def test_disk_backend_is_shared(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer, reader = _FragmentStore(10, tmp), _FragmentStore(10, tmp)
+            writer.set('a', 'v1', '<li>A</li>')
+            self.assertEqual(reader.get('a', 'v1'), '<li>A</li>')
+            writer.invalidate('a')
+            self.assertIsNone(_FragmentStore(10, tmp).get('a', 'v1'))
+
+    def test_disk_backend_is_bounded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = _FragmentStore(3, tmp)
+            for i, key in enumerate('abcde'):
+                store.set(key, 'v1', key.upper())
+                os.utime(os.path.join(tmp, key + '.html'), (i, i)) # Distinct, increasing mtimes
+            self.assertEqual(sorted(os.listdir(tmp)), ['c.html', 'd.html', 'e.html'])
+            self.assertEqual(_FragmentStore(3, tmp).get('c', 'v1'), 'C')
+
+
+class TestDashboardFragmentCache(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        user = User.query.filter_by(username="testuser").first()
+        self.trans = Transcription(body="Cached transcript body.", user_id=user.id)
+        db.session.add(self.trans)
+        db.session.commit()
+        self.login()
+
+    def test_second_render_hits_cache(self):
+        first = self.client.get('/dashboard')
+        second = self.client.get('/dashboard')
+        self.assertEqual(first.data, second.data)
+        stats = self.client.get('/cache_stats').get_json()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_creating_mom_refreshes_row(self):
+        self.assertIn(b'Generate MoM', self.client.get('/dashboard').data)
+        self.client.post(f'/transcription/{self.trans.id}/mom', data={'summary': 'Minutes.'})
+        response = self.client.get('/dashboard')
+        self.assertIn(b'View/Edit MoM', response.data)
+        self.assertNotIn(b'Generate MoM', response.data)
@@ -0,0 +1,68 @@
+from tests.base_test import BaseTestCase, db
+from app.models import User, Transcription, LshBucket
+from app import dedup
+
+MEETING = ("Good morning everyone, thanks for joining the quarterly planning meeting. "
+           "First we will review the budget for the marketing team and then discuss hiring. "
+           "Sarah will present the roadmap for the mobile app and we will agree on the launch date. "
+           "Finally we need volunteers for the customer conference next month.")
+# The same meeting picked up by a second laptop: slightly different recognition
+SECOND_LAPTOP = MEETING.replace("Good morning everyone", "Morning everyone")\
+                       .replace("Sarah will present", "Sara will present")
+UNRELATED = ("The build is failing on the main branch because of a flaky integration test. "
+             "We should quarantine it and open a ticket for the platform team to investigate.")
+
+
+class TestMinHash(BaseTestCase):
+
+    def test_similar_texts_share_buckets(self):
+        a = set(dedup.band_buckets(dedup.minhash(MEETING)))
+        b = set(dedup.band_buckets(dedup.minhash(SECOND_LAPTOP)))
+        c = set(dedup.band_buckets(dedup.minhash(UNRELATED)))
+        self.assertTrue(a & b)
+        self.assertFalse(a & c)
+
+    def test_signature_is_deterministic(self):
+        self.assertEqual(dedup.minhash(MEETING), dedup.minhash(MEETING))
+        self.assertEqual(len(dedup.minhash("short")), dedup.NUM_PERM)
+
+
+class TestDuplicateFlagging(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_test_user(username="laptop2", email="laptop2@example.com")
+        self.login()
+
+    def test_save_flags_near_duplicate_from_another_user(self):
+        original = Transcription(body=MEETING, user_id=self.other.id)
+        db.session.add(original)
+        db.session.flush()
+        dedup.index_transcription(original, 90)
+        db.session.commit()
+
+        self.client.post('/save_transcription', json={'transcription': SECOND_LAPTOP})
+        self.client.post('/save_transcription', json={'transcription': UNRELATED})
+        user = User.query.filter_by(username="testuser").first()
+        saved = {t.body: t for t in Transcription.query.filter_by(user_id=user.id)}
+        self.assertEqual(saved[SECOND_LAPTOP].duplicate_of_id, original.id)
+        self.assertIsNone(saved[UNRELATED].duplicate_of_id)
+        self.assertEqual(LshBucket.query.count(), 3 * dedup.BANDS)
+
+        response = self.client.get('/dashboard')
+        self.assertEqual(response.data.count(b'Possible duplicate'), 1)
+
+    def test_batch_scan_clusters_existing_rows(self):
+        user = User.query.filter_by(username="testuser").first()
+        for body in (MEETING, UNRELATED, SECOND_LAPTOP, MEETING):
+            db.session.add(Transcription(body=body, user_id=user.id))
+        db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=['dedup-scan', '--batch-size', '2'])
+        self.assertIn('Indexed 4 transcriptions, flagged 2 as near-duplicates.', result.output)
+        rows = Transcription.query.order_by(Transcription.id).all()
+        self.assertEqual([t.duplicate_of_id for t in rows], [None, None, rows[0].id, rows[0].id])
+
+        # Already indexed rows are skipped on the next run
+        result = self.app.test_cli_runner().invoke(args=['dedup-scan'])
+        self.assertIn('Indexed 0 transcriptions', result.output)
@@ -0,0 +1,45 @@
+import io
+import zipfile
+
+from tests.base_test import BaseTestCase, db
+from app.models import User, Transcription, MoM
+
+
+class TestExport(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.query.filter_by(username="testuser").first()
+        self.login()
+
+    def test_zip_contains_transcripts_and_moms(self):
+        first = Transcription(body="First meeting text.", user_id=self.user.id)
+        second = Transcription(body="Second meeting text.", user_id=self.user.id)
+        other = self.create_test_user(username="other", email="other@example.com")
+        db.session.add_all([first, second, Transcription(body="Not mine.", user_id=other.id)])
+        db.session.commit()
+        db.session.add(MoM(summary="Minutes of the first.", transcription_id=first.id, user_id=self.user.id))
+        db.session.commit()
+
+        response = self.client.get('/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/zip')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+
+        archive = zipfile.ZipFile(io.BytesIO(response.data))
+        self.assertIsNone(archive.testzip())
+        contents = {name: archive.read(name).decode('utf-8') for name in archive.namelist()}
+        self.assertEqual(len(contents), 3)
+        self.assertEqual(sorted(contents.values()),
+                         ["First meeting text.", "Minutes of the first.", "Second meeting text."])
+        self.assertTrue(any(name.endswith('-mom.txt') for name in contents))
+
+    def test_empty_export_is_valid_zip(self):
+        response = self.client.get('/export')
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(response.data)).namelist(), [])
+
+    def test_export_requires_login(self):
+        self.logout()
+        response = self.client.get('/export')
+        self.assertEqual(response.status_code, 302)
@@ -1,6 +1,7 @@
 from tests.base_test import BaseTestCase, db
 from app.models import User, Transcription, MoM
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 
 class TestModelRelationships(BaseTestCase):
 
@@ -94,5 +95,32 @@ class TestModelRelationships(BaseTestCase):
         db.session.commit()
         self.assertEqual(repr(mom), f'<MoM {mom.id} for Transcription {trans.id} by User {user.id}>')
 
+    def test_ensure_schema_reports_missing_columns(self):
+        from app.schema import ensure_schema
+        self.assertEqual(ensure_schema(), [])
+        db.session.execute(db.text('ALTER TABLE mo_m RENAME COLUMN updated_at TO old_updated_at'))
+        db.session.commit()
+        self.assertEqual(ensure_schema(), ['mo_m.updated_at'])
+
+    def test_upgrade_schema_adds_columns_and_unique_key(self):
+        from app.schema import ensure_schema, upgrade_schema
+        # The transcription table as it was before the offline sync work
+        db.session.execute(db.text('DROP TABLE transcription'))
+        db.session.execute(db.text('CREATE TABLE transcription (id INTEGER PRIMARY KEY, body TEXT NOT NULL, '
+                                   'timestamp DATETIME, user_id INTEGER REFERENCES user (id))'))
+        db.session.commit()
+        missing = ensure_schema()
+        self.assertIn('transcription.client_id', missing)
+        self.assertIn('transcription.unique(user_id, client_id)', missing)
+
+        self.assertEqual(upgrade_schema(), [])
+        self.assertEqual(ensure_schema(), [])
+        user = User.query.filter_by(username="testuser").first()
+        db.session.add_all([Transcription(body='One', user_id=user.id, client_id='rec'),
+                            Transcription(body='Two', user_id=user.id, client_id='rec')])
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+from tests.base_test import BaseTestCase, db
+from app.models import User, Transcription
+from app.ratelimit import _SharedLimits
+
+
+class TestRateLimiting(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['RATELIMIT_BURST'] = 3
+        self.app.config['RATELIMIT_PER_MINUTE'] = 1
+        self.login()
+
+    def _save(self):
+        return self.client.post('/save_transcription', json={'transcription': 'Rate limited text.'})
+
+    def test_burst_then_429_with_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self._save().status_code, 200)
+        response = self._save()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.get_json()['status'], 'error')
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+        self.assertEqual(Transcription.query.count(), 3)
+
+    def test_limits_are_per_user(self):
+        for _ in range(4):
+            self._save()
+        self.logout()
+        self.create_test_user(username='second', email='second@example.com')
+        self.login(username='second')
+        self.assertEqual(self._save().status_code, 200)
+
+    def test_mom_get_is_not_limited(self):
+        user = User.query.filter_by(username='testuser').first()
+        trans = Transcription(body='Some text.', user_id=user.id)
+        db.session.add(trans)
+        db.session.commit()
+        for _ in range(5):
+            response = self.client.get(f'/transcription/{trans.id}/mom')
+            self.assertEqual(response.status_code, 200)
+
+    def test_concurrency_cap_returns_503(self):
+        limits = self.app.extensions['ratelimit']
+        while limits.enter(0.0) is not None:
+            pass
+        response = self._save()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_disabled_limiter_allows_everything(self):
+        self.app.config['RATELIMIT_ENABLED'] = False
+        for _ in range(5):
+            self.assertEqual(self._save().status_code, 200)
+
+
+class TestSharedLimits(BaseTestCase):
+
+    def test_state_is_shared_through_the_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'buckets')
+            first, second = _SharedLimits(path, 2, slots=64), _SharedLimits(path, 2, slots=64)
+            self.assertEqual(first.take('k', 1.0, 2, 100.0), 0)
+            self.assertEqual(second.take('k', 1.0, 2, 100.0), 0)
+            self.assertGreater(first.take('k', 1.0, 2, 100.0), 0)
+            # A second later one token has been refilled
+            self.assertEqual(second.take('k', 1.0, 2, 101.0), 0)
+
+    def test_in_flight_cap_is_shared_through_the_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'limits')
+            first, second = _SharedLimits(path, 2, slots=64), _SharedLimits(path, 2, slots=64)
+            a = first.enter(100.0)
+            b = second.enter(100.0)
+            self.assertIsNotNone(a)
+            self.assertIsNotNone(b)
+            self.assertIsNone(first.enter(100.0))
+            second.leave(b)
+            self.assertIsNotNone(first.enter(100.0))
+
+    def test_slots_of_dead_processes_are_reclaimed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            limits = _SharedLimits(os.path.join(tmp, 'limits'), 1, slots=64)
+            pid = os.fork()
+            if pid == 0:
+                limits.enter(100.0) # Exits without leaving, like a killed worker
+                os._exit(0)
+            os.waitpid(pid, 0)
+            self.assertIsNotNone(limits.enter(100.0))
+
+    @unittest.skipUnless(os.getuid() == 0, 'needs root to hand the file to another user')
+    def test_file_owned_by_someone_else_is_refused(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'limits')
+            open(path, 'wb').close()
+            os.chown(path, 12345, -1)
+            with self.assertRaises(PermissionError):
+                _SharedLimits(path, 1, slots=64).take('k', 1.0, 2, 100.0)
@@ -0,0 +1,97 @@
+from tests.base_test import BaseTestCase, db
+from app.models import Transcription
+from app.segments import SegmentIndex
+
+SEGMENTS = [
+    {'text': 'Welcome everyone.', 'start': 0.0, 'end': 2.5},
+    {'text': 'First item is the budget.', 'start': 3.0, 'end': 6.0},
+    {'text': 'Second item is hiring.', 'start': 720.0, 'end': 724.0},
+    {'text': 'That is all for today.', 'start': 900.0, 'end': 903.0},
+]
+BODY = '\n'.join(s['text'] for s in SEGMENTS)
+
+
+class TestSegmentIndex(BaseTestCase):
+
+    def test_build_locates_segments_in_body(self):
+        index = SegmentIndex.build(BODY, SEGMENTS)
+        self.assertEqual(len(index), 4)
+        for i, segment in enumerate(SEGMENTS):
+            span = index.segment(i)
+            self.assertEqual(BODY[span['char_start']:span['char_end']], segment['text'])
+        self.assertEqual(index.duration, 903.0)
+
+    def test_round_trip_bytes(self):
+        index = SegmentIndex.build(BODY, SEGMENTS)
+        restored = SegmentIndex.from_bytes(index.to_bytes())
+        self.assertEqual(list(restored.starts), list(index.starts))
+        self.assertEqual(list(restored.char_ends), list(index.char_ends))
+
+    def test_time_range_and_char_lookup(self):
+        index = SegmentIndex.build(BODY, SEGMENTS)
+        start, end = index.char_range_for_time(1.0, 5.0)
+        self.assertEqual(BODY[start:end], 'Welcome everyone.\nFirst item is the budget.')
+        self.assertIsNone(index.char_range_for_time(100.0, 200.0))
+        self.assertEqual(index.segment_at_char(BODY.index('hiring')), 2)
+        self.assertIsNone(index.segment_at_char(len(BODY) + 10))
+
+    def test_out_of_order_append_rejected(self):
+        index = SegmentIndex()
+        index.append(5.0, 6.0, 10, 20)
+        with self.assertRaises(ValueError):
+            index.append(1.0, 2.0, 0, 5)
+
+
+class TestSegmentRoutes(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def _save(self):
+        response = self.client.post('/save_transcription', json={'transcription': BODY, 'segments': SEGMENTS})
+        self.assertEqual(response.status_code, 200)
+        return Transcription.query.first()
+
+    def test_save_stores_segment_index(self):
+        trans = self._save()
+        self.assertIsNotNone(trans.segment_index)
+        self.assertEqual(len(trans.get_segment_index()), 4)
+
+    def test_save_rejects_malformed_segments(self):
+        response = self.client.post('/save_transcription', json={'transcription': BODY, 'segments': [{'text': 'x'}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Transcription.query.count(), 0)
+
+    def test_save_rejects_non_finite_or_negative_times(self):
+        for start, end in ((0, 'inf'), ('nan', 1), (-1, 2)):
+            response = self.client.post('/save_transcription', json={
+                'transcription': BODY, 'segments': [{'text': 'Welcome everyone.', 'start': start, 'end': end}]})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(Transcription.query.count(), 0)
+        trans = self._save()
+        response = self.client.get(f'/transcription/{trans.id}/segments?start=0&end=inf')
+        self.assertEqual(response.status_code, 400)
+
+    def test_text_between_minutes(self):
+        trans = self._save()
+        response = self.client.get(f'/transcription/{trans.id}/segments?start=720&end=900')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['text'], 'Second item is hiring.')
+
+    def test_segment_containing_char(self):
+        trans = self._save()
+        response = self.client.get(f'/transcription/{trans.id}/segments?char={BODY.index("budget")}')
+        self.assertEqual(response.status_code, 200)
+        segment = response.get_json()['segment']
+        self.assertEqual(segment['text'], 'First item is the budget.')
+        self.assertEqual(segment['start'], 3.0)
+
+    def test_segments_of_other_user_not_found(self):
+        other = self.create_test_user(username='other', email='other@example.com')
+        trans = Transcription(body=BODY, user_id=other.id,
+                              segment_index=SegmentIndex.build(BODY, SEGMENTS).to_bytes())
+        db.session.add(trans)
+        db.session.commit()
+        response = self.client.get(f'/transcription/{trans.id}/segments?start=0&end=10')
+        self.assertEqual(response.status_code, 404)
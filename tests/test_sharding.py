@@ -0,0 +1,159 @@
+from unittest import mock
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from tests.base_test import BaseTestCase, db
+from app import create_app, sharding
+from app.config import TestConfig
+from app.models import User, UserShard, Transcription, MoM, UserDailyStats
+from app.routing import shard_engine
+from app.routing import using_shard
+
+
+class ShardedTestConfig(TestConfig):
+    # Each in-memory bind is a separate database
+    SHARD_BINDS = {'shard_a': 'sqlite:///:memory:'}
+    SHARD_MOVE_DRAIN_SECONDS = 0
+
+
+class TestSharding(BaseTestCase):
+
+    def setUp(self):
+        self.app = create_app(ShardedTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        sharding.create_shard_tables()
+        self.client = self.app.test_client()
+        self.user = self.create_test_user()
+
+    def tearDown(self):
+        super().tearDown()
+        # init_app registers a MetaData per bind key on the shared db object
+        db.metadatas.pop('shard_a', None)
+
+    def _count(self, shard, model=Transcription):
+        with using_shard(shard):
+            db.session.expire_all()
+            return model.query.filter_by(user_id=self.user.id).count()
+
+    def _place(self, user, shard):
+        db.session.add(UserShard(user_id=user.id, shard=shard))
+        db.session.commit()
+
+    def test_registration_spreads_users_over_shards(self):
+        for name in ('alice', 'bob'):
+            self.client.post('/auth/register', data=dict(username=name, email=f'{name}@example.com',
+                                                         password='password', password2='password'))
+        shards = {UserShard.query.get(User.query.filter_by(username=name).first().id).shard
+                  for name in ('alice', 'bob')}
+        self.assertEqual(shards, {'default', 'shard_a'})
+
+    def test_unmapped_users_stay_on_default(self):
+        self.assertEqual(sharding.shard_for_user(self.user.id), 'default')
+
+    def test_writes_and_reads_go_to_owning_shard(self):
+        self._place(self.user, 'shard_a')
+        self.login()
+        response = self.client.post('/save_transcription', json={'transcription': 'Stored on shard a.'})
+        self.assertEqual(response.get_json()['status'], 'success')
+        self.assertEqual(self._count('shard_a'), 1)
+        self.assertEqual(self._count('default'), 0)
+        self.assertEqual(self._count('shard_a', UserDailyStats), 1)
+
+        response = self.client.get('/dashboard')
+        self.assertIn(b'Stored on shard a.', response.data)
+
+    def test_move_user_copies_rows_and_flips_map(self):
+        self.login()
+        self.client.post('/save_transcription', json={'transcription': 'First meeting notes here.'})
+        self.client.post('/save_transcription', json={'transcription': 'First meeting notes here.'})
+        with using_shard('default'):
+            first, second = Transcription.query.order_by(Transcription.id).all()
+            db.session.add(MoM(summary='Summary', transcription_id=second.id, user_id=self.user.id))
+            db.session.commit()
+            self.assertEqual(second.duplicate_of_id, first.id)
+
+        moved = sharding.move_user(self.user.id, 'shard_a', batch_size=1)
+        self.assertEqual(moved, 2)
+        self.assertEqual(sharding.shard_for_user(self.user.id), 'shard_a')
+        self.assertEqual(self._count('default'), 0)
+        self.assertEqual(self._count('default', MoM), 0)
+        with using_shard('shard_a'):
+            first, second = Transcription.query.order_by(Transcription.id).all()
+            self.assertEqual(second.duplicate_of_id, first.id)
+            self.assertEqual(second.mom.summary, 'Summary')
+
+        response = self.client.get('/dashboard')
+        self.assertIn(b'First meeting notes here.', response.data)
+
+    def test_moved_ids_are_not_reused_or_served_from_cache(self):
+        self.login()
+        self.client.post('/save_transcription', json={'transcription': 'ALICE SECRET notes.'})
+        self.assertIn(b'ALICE SECRET', self.client.get('/dashboard').data) # Row is now cached
+        with using_shard('default'):
+            moved_id = Transcription.query.one().id
+        sharding.move_user(self.user.id, 'shard_a')
+        self.logout()
+
+        self.create_test_user(username='bob', email='bob@example.com')
+        self.login(username='bob')
+        self.client.post('/save_transcription', json={'transcription': 'Bob owns this one.'})
+        with using_shard('default'):
+            self.assertNotEqual(Transcription.query.one().id, moved_id)
+        response = self.client.get('/dashboard')
+        self.assertIn(b'Bob owns this one.', response.data)
+        self.assertNotIn(b'ALICE SECRET', response.data)
+
+    def test_write_landing_during_move_is_not_deleted(self):
+        self.login()
+        self.client.post('/save_transcription', json={'transcription': 'Copied with the move.'})
+        straggler = {}
+        real_copy = sharding._copy_user_rows
+
+        def copy_then_write(src, dst, user_id, batch_size):
+            copied = real_copy(src, dst, user_id, batch_size)
+            # A write that passed select_shard before the move started commits now
+            with shard_engine(db, 'default').begin() as conn:
+                table = Transcription.__table__
+                straggler['id'] = conn.execute(table.insert().values(body='Late write.', user_id=user_id)
+                                                .returning(table.c.id)).scalar()
+            return copied
+
+        with mock.patch.object(sharding, '_copy_user_rows', copy_then_write):
+            self.assertEqual(sharding.move_user(self.user.id, 'shard_a'), 1)
+        with using_shard('default'):
+            db.session.expire_all()
+            self.assertEqual([t.id for t in Transcription.query.all()], [straggler['id']])
+
+    def test_move_to_unknown_shard_is_rejected(self):
+        with self.assertRaises(ValueError):
+            sharding.move_user(self.user.id, 'nowhere')
+
+    def test_writes_rejected_while_moving(self):
+        db.session.add(UserShard(user_id=self.user.id, shard='default', moving=True))
+        db.session.commit()
+        self.login()
+        response = self.client.post('/save_transcription', json={'transcription': 'Too early.'})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(self.client.get('/dashboard').status_code, 200)
+
+    def test_maintenance_commands_cover_every_shard(self):
+        other = self.create_test_user(username='other', email='other@example.com')
+        self._place(other, 'shard_a')
+        for user, shard in ((self.user, 'default'), (other, 'shard_a')):
+            with using_shard(shard):
+                db.session.add(Transcription(body='Some words here.', user_id=user.id))
+                db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=['rebuild-stats'])
+        self.assertIn('from 2 transcriptions', result.output)
+
+    def test_shard_tables_do_not_reference_default_only_tables(self):
+        # A shard on a real server would reject a foreign key to a table it does not have
+        ddl = '\n'.join(str(sa.schema.CreateTable(table).compile(dialect=postgresql.dialect()))
+                        for table in sharding.shard_metadata().sorted_tables)
+        self.assertNotIn('REFERENCES "user"', ddl)
+        self.assertIn('REFERENCES transcription', ddl)
+        self.assertEqual(len(User.__table__.metadata.tables['transcription'].foreign_keys), 2)
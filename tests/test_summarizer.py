@@ -0,0 +1,111 @@
+from tests.base_test import BaseTestCase
+from app.models import Transcription, SummaryDraft
+from app.summarizer import IncrementalSummarizer
+
+SEGMENTS = [
+    "Welcome to the weekly sync.",
+    "The budget review is the main topic today. The budget for",
+    "marketing grew by ten percent.",
+    "Lunch was good.",
+    "We agreed the budget increase needs approval from finance.",
+    "See you next week.",
+]
+
+
+class TestIncrementalSummarizer(BaseTestCase):
+
+    def test_sentences_complete_across_segments(self):
+        summarizer = IncrementalSummarizer()
+        summarizer.feed(SEGMENTS[1])
+        self.assertEqual(summarizer.pending, "The budget for")
+        summarizer.feed(SEGMENTS[2])
+        self.assertEqual(summarizer.pending, "")
+        self.assertIn((1, "The budget for marketing grew by ten percent."),
+                      [(seq, sentence) for _, seq, sentence in summarizer.candidates])
+
+    def test_summary_prefers_central_sentences_in_original_order(self):
+        summarizer = IncrementalSummarizer(num_sentences=2)
+        for segment in SEGMENTS:
+            summarizer.feed(segment)
+        self.assertEqual(summarizer.summary(),
+                         "The budget review is the main topic today. "
+                         "We agreed the budget increase needs approval from finance.")
+
+    def test_candidate_heap_is_bounded(self):
+        summarizer = IncrementalSummarizer(num_sentences=2)
+        for i in range(100):
+            summarizer.feed(f"Sentence number {i} about topic {i % 7}.")
+        self.assertEqual(len(summarizer.candidates), summarizer.max_candidates)
+        self.assertEqual(summarizer.seq, 100)
+
+    def test_unpunctuated_stream_is_flushed(self):
+        summarizer = IncrementalSummarizer(max_pending_chars=50)
+        for _ in range(10):
+            summarizer.feed("words without any punctuation at all")
+        self.assertLessEqual(len(summarizer.pending), 50 + len("words without any punctuation at all") + 1)
+        self.assertGreater(summarizer.seq, 0)
+
+    def test_state_round_trip(self):
+        summarizer = IncrementalSummarizer()
+        for segment in SEGMENTS[:3]:
+            summarizer.feed(segment)
+        restored = IncrementalSummarizer.from_bytes(summarizer.to_bytes())
+        for segment in SEGMENTS[3:]:
+            summarizer.feed(segment)
+            restored.feed(segment)
+        self.assertEqual(restored.summary(), summarizer.summary())
+
+    def test_state_keeps_pending_limit(self):
+        restored = IncrementalSummarizer.from_bytes(IncrementalSummarizer(max_pending_chars=50).to_bytes())
+        self.assertEqual(restored.max_pending_chars, 50)
+
+
+class TestSummaryDraft(BaseTestCase):
+
+    def test_mom_draft_comes_from_saved_state(self):
+        self.login()
+        body = ' '.join(SEGMENTS)
+        self.client.post('/save_transcription', json={
+            'transcription': body,
+            'segments': [{'text': t, 'start': i, 'end': i + 1} for i, t in enumerate(SEGMENTS)],
+        })
+        trans = Transcription.query.first()
+        self.assertIsNotNone(trans.summary_state)
+        expected = IncrementalSummarizer.from_bytes(trans.summary_state).summary()
+        response = self.client.get(f'/transcription/{trans.id}/mom')
+        self.assertIn(expected.encode('utf-8'), response.data)
+
+    def _feed(self, offset, texts, client_id='rec-1'):
+        return self.client.post('/summary_draft', json={
+            'client_id': client_id, 'offset': offset, 'segments': [{'text': t} for t in texts]})
+
+    def test_segments_are_fed_while_recording(self):
+        self.login()
+        response = self._feed(0, SEGMENTS[:2])
+        self.assertEqual(response.get_json()['segments_fed'], 2)
+        # A retry overlapping what the server already has only feeds the new segments
+        response = self._feed(1, SEGMENTS[1:])
+        data = response.get_json()
+        self.assertEqual(data['segments_fed'], len(SEGMENTS))
+        expected = IncrementalSummarizer()
+        for segment in SEGMENTS:
+            expected.feed(segment)
+        self.assertEqual(data['summary'], expected.summary())
+
+    def test_gap_is_rejected_with_resume_position(self):
+        self.login()
+        self._feed(0, SEGMENTS[:2])
+        response = self._feed(3, SEGMENTS[3:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['segments_fed'], 2)
+
+    def test_save_takes_over_the_draft(self):
+        self.login()
+        self._feed(0, SEGMENTS)
+        draft_state = SummaryDraft.query.one().state
+        self.client.post('/save_transcription', json={
+            'client_id': 'rec-1', 'transcription': ' '.join(SEGMENTS),
+            'segments': [{'text': t, 'start': i, 'end': i + 1} for i, t in enumerate(SEGMENTS)],
+        })
+        self.assertEqual(Transcription.query.one().summary_state, draft_state)
+        self.assertEqual(SummaryDraft.query.count(), 0)
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from tests.base_test import BaseTestCase
+from app import main
+from app.models import User, Transcription
+
+
+class TestOfflineSync(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def _sync(self, items):
+        return self.client.post('/sync_transcriptions', json={'transcriptions': items})
+
+    def test_batch_saved_with_per_item_status(self):
+        response = self._sync([
+            {'client_id': 'a', 'transcription': 'First offline transcript.'},
+            {'client_id': 'b', 'transcription': '   '},
+            {'client_id': 'c', 'transcription': 'Second offline transcript.',
+             'segments': [{'text': 'Second offline transcript.', 'start': 0, 'end': 2}]},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()['results']
+        self.assertEqual([r['status'] for r in results], ['saved', 'error', 'saved'])
+        self.assertEqual(results[1]['message'], 'Transcription is empty')
+        self.assertEqual(Transcription.query.count(), 2)
+        saved = Transcription.query.get(results[2]['id'])
+        self.assertEqual(saved.client_id, 'c')
+        self.assertIsNotNone(saved.segment_index)
+
+    def test_resync_reports_duplicates(self):
+        items = [{'client_id': 'x', 'transcription': 'Queued once.'},
+                 {'client_id': 'x', 'transcription': 'Queued once.'}]
+        results = self._sync(items).get_json()['results']
+        self.assertEqual([r['status'] for r in results], ['saved', 'duplicate'])
+        results = self._sync(items[:1]).get_json()['results']
+        self.assertEqual(results[0]['status'], 'duplicate')
+        self.assertEqual(Transcription.query.count(), 1)
+
+    def test_save_then_sync_same_recording_is_idempotent(self):
+        self.client.post('/save_transcription', json={'client_id': 'rec-1', 'transcription': 'Saved online.'})
+        response = self.client.post('/save_transcription', json={'client_id': 'rec-1', 'transcription': 'Saved online.'})
+        self.assertEqual(response.get_json()['status'], 'success')
+        results = self._sync([{'client_id': 'rec-1', 'transcription': 'Saved online.'}]).get_json()['results']
+        self.assertEqual(results[0]['status'], 'duplicate')
+        self.assertEqual(Transcription.query.count(), 1)
+
+    def test_concurrent_save_of_same_recording_succeeds_once(self):
+        payload = {'client_id': 'race', 'transcription': 'Saved from another tab.'}
+        self.client.post('/save_transcription', json=payload)
+        # The other tab's commit lands between our duplicate check and our insert
+        with mock.patch.object(main, '_existing_client_ids', return_value=set()):
+            response = self.client.post('/save_transcription', json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['status'], 'success')
+        self.assertEqual(Transcription.query.count(), 1)
+
+    def test_concurrent_sync_of_same_recording_reports_duplicate(self):
+        self._sync([{'client_id': 'race', 'transcription': 'Synced from another tab.'}])
+        stored = main._existing_client_ids(User.query.first().id, ['race'])
+        # The other tab's commit lands between our duplicate check and our insert
+        with mock.patch.object(main, '_existing_client_ids', side_effect=[set(), stored]):
+            response = self._sync([{'client_id': 'race', 'transcription': 'Synced from another tab.'},
+                                   {'client_id': 'other', 'transcription': 'Only here.'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.get_json()['results']], ['duplicate', 'saved'])
+        self.assertEqual(Transcription.query.count(), 2)
+
+    def test_client_ids_are_scoped_per_user(self):
+        self._sync([{'client_id': 'shared', 'transcription': 'Mine.'}])
+        self.logout()
+        self.create_test_user(username='second', email='second@example.com')
+        self.login(username='second')
+        results = self._sync([{'client_id': 'shared', 'transcription': 'Theirs.'}]).get_json()['results']
+        self.assertEqual(results[0]['status'], 'saved')
+        second = User.query.filter_by(username='second').first()
+        self.assertEqual(Transcription.query.filter_by(user_id=second.id).count(), 1)
+
+    def test_rejects_empty_and_oversized_batches(self):
+        self.assertEqual(self._sync([]).status_code, 400)
+        self.app.config['SYNC_MAX_ITEMS'] = 2
+        response = self._sync([{'transcription': 'x'}] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Transcription.query.count(), 0)
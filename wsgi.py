@@ -0,0 +1,6 @@
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+# The app is imported once in the gunicorn master (preload_app) and the
+# workers are forked from it. Schema checks run in the on_starting hook.
+from app import create_app
+
+app = create_app()